@@ -1,41 +1,708 @@
+from base64 import b32hexencode
+from functools import lru_cache
+from io import TextIOBase
+from itertools import islice
+from math import lcm
+from operator import index
+
+try:
+    import numpy
+except ImportError: # Optional, convert_many works a value at a time without it
+    numpy = None
+
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+DIGIT_CHECKS = {
+    base: {ord(c): None for c in DIGITS[:base] + DIGITS[:base].upper()}
+    for base in range(2, 37)
+} # str.translate tables deleting every digit of each base
+
+NATIVE_FORMATS = {2: "b", 8: "o", 10: "d", 16: "x"} # Bases format() can write
+
+BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+BASE64_URL = BASE64[:62] + "-_"
+    # Alphabets for Codec, as used by Bitcoin addresses, short ids and
+    # (for the digits only) RFC 4648
+
+
+def digit_pairs(alphabet: str) -> list:
+    '''
+    digit_pairs(alphabet:str)
+
+    Returns every two digit string of an alphabet, indexed by value.
+    '''
+    return [high + low for high in alphabet for low in alphabet]
+
+
+@lru_cache(maxsize=None)
+def word_size(base: int) -> tuple:
+    '''
+    word_size(base:int)
+
+    Returns the largest even number of digits of a base that fit in a
+    machine word, and base to that power (cached).
+    '''
+    width = 2
+    while base ** (width + 2) < 1 << 62:
+        width += 2
+    return width, base ** width
+
+
+DIGIT_PAIRS = {base: digit_pairs(DIGITS[:base]) for base in range(2, 37)}
+
+CHUNK_DIGITS = 1000
+    # Digits converted at once by int() and format(), well under the
+    # limit Python puts on converting long numbers to and from strings
+
+BATCH_SIZE = 4096 # Values converted together by convert_many
+
+STREAM_CHUNK = 1 << 16 # Characters read at a time by iter_convert
+
+POWER_BITS = {2: 1, 4: 2, 8: 3, 16: 4, 32: 5} # Bits in a digit of each power of two
+
+BLOCK_BITS = {4: 4, 32: 40}
+    # Bits written at a time for bases written through hexadecimal digits
+    # (base 4) or b32hexencode (base 32, five bytes at a time)
+
+HEX_TO_BASE4 = {ord(c): format(i // 4, "d") + format(i % 4, "d")
+    for i, c in enumerate(DIGITS[:16])} # Two base 4 digits of each hex digit
+
+WHITESPACE = {ord(c): None for c in " \t\n\r\v\f"} # Skipped in streams
+
+INVALID, PADDING = 255, 254 # Marks in the tables of digit_value_table
+
+
+def digit_value_table(base: int):
+    '''
+    digit_value_table(base:int)
+
+    Returns a NumPy array giving the value of each character code
+    below 128 as a digit of a base, with 128 standing for every other
+    code. Codes that are not digits are INVALID, and code 0 (which
+    pads the shorter strings of an array) is PADDING.
+    '''
+    table = numpy.full(129, INVALID, numpy.uint8)
+    table[0] = PADDING
+
+    for value, c in enumerate(DIGITS[:base]):
+        table[ord(c)] = table[ord(c.upper())] = value
+
+    return table
+
+
+if numpy is not None:
+    DIGIT_CODES = numpy.frombuffer(DIGITS.encode(), numpy.uint8)
+        # Character code of each digit value
+
+    ARRAY_DIGIT_VALUES = {base: digit_value_table(base)
+        for base in range(2, 37)}
+
+
+@lru_cache(maxsize=128)
+def power(base: int, exponent: int) -> int:
+    '''
+    power(base:int, exponent:int)
+
+    Returns base**exponent, cached, as the same powers are used to
+    split up every long number.
+    '''
+    return base ** exponent
+
+
+def parse_number(num: str, base: int, values: dict=None) -> int:
+    '''
+    parse_number(num:str, base:int, values:dict=None)
+
+    Returns the value of a string of digits in a base, which must
+    already be known to be valid. Long strings are split in two, and
+    the value of the high half is shifted up by a power of the base, so
+    that the work is spent on a few large multiplications rather than
+    one per digit. Digits are read by int(), unless values maps the
+    single and two digit strings of another alphabet to their values
+    (see Codec).
+    '''
+    if values is not None:
+        if len(num) <= CHUNK_DIGITS:
+            return parse_chunk(num, base, values)
+    elif len(num) <= CHUNK_DIGITS or not base & (base - 1):
+        return int(num, base) # No length limit for powers of two
+
+    size = CHUNK_DIGITS
+    while size * 2 < len(num):
+        size *= 2
+
+    return parse_number(num[:-size], base, values) * power(base, size) + \
+        parse_number(num[-size:], base, values)
+
+
+def parse_chunk(num: str, base: int, values: dict) -> int:
+    '''
+    parse_chunk(num:str, base:int, values:dict)
+
+    Returns the value of a string of digits in a base, two digits at a
+    time, given a dictionary of the values of its one and two digit
+    strings.
+    '''
+    start = len(num) % 2
+    value = values[num[0]] if start else 0
+    square = base * base
+
+    for i in range(start, len(num), 2):
+        value = value * square + values[num[i:i + 2]]
+
+    return value
+
+
+def format_chunk(value: int, base: int, pairs: list=None) -> str:
+    '''
+    format_chunk(value:int, base:int, pairs:list=None)
+
+    Returns a value of at most CHUNK_DIGITS digits written in a base,
+    with the digits of DIGITS, or of another alphabet given all its two
+    digit strings as pairs (see digit_pairs).
+    '''
+    if pairs is None:
+        if base in NATIVE_FORMATS:
+            return format(value, NATIVE_FORMATS[base])
+        pairs = DIGIT_PAIRS[base]
+
+    square, zero = base * base, pairs[0][0]
+    width, word = word_size(base)
+
+    # Peel off as many digits as fit in a machine word at a time, two
+    # digits at a time
+    parts = []
+    while value >= word:
+        value, low = divmod(value, word)
+        digits = []
+        for _ in range(width // 2):
+            low, pair = divmod(low, square)
+            digits.append(pairs[pair])
+        parts.append("".join(reversed(digits)))
+
+    digits = []
+    while value:
+        value, pair = divmod(value, square)
+        digits.append(pairs[pair])
+    parts.append("".join(reversed(digits)))
+
+    return "".join(reversed(parts)).lstrip(zero) or zero
+
+
+def format_number(value: int, base: int, pairs: list=None) -> str:
+    '''
+    format_number(value:int, base:int, pairs:list=None)
+
+    Returns a non-negative value written in a base, with the digits of
+    DIGITS or of the alphabet of pairs (see format_chunk). Large values
+    are split by the largest power of the base (of CHUNK_DIGITS times a
+    power of two digits) below them, and each half is written in turn.
+    Bases 2, 8 and 16 have no length limit, so format() writes them
+    directly.
+    '''
+    if pairs is None and base in (2, 8, 16):
+        return format(value, NATIVE_FORMATS[base])
+
+    if value < power(base, CHUNK_DIGITS):
+        return format_chunk(value, base, pairs)
+
+    zero = "0" if pairs is None else pairs[0][0]
+    parts = []
+
+    def emit(value, width):
+        if value < power(base, CHUNK_DIGITS):
+            parts.append(format_chunk(value, base, pairs).rjust(width, zero))
+            return
+
+        size = CHUNK_DIGITS
+        while power(base, size * 2) <= value:
+            size *= 2
+
+        high, low = divmod(value, power(base, size))
+        emit(high, width - size)
+        emit(low, size)
+
+    emit(value, 0)
+    return "".join(parts)
+
+
+def check_bases(new_base: int, original_base: int):
+    '''
+    check_bases(new_base:int, original_base:int)
+
+    Raises TypeError if either base is larger than 36, and ValueError
+    if either is smaller than 2.
+    '''
+
+    largest_base = max(new_base, original_base)
+
+    if largest_base > 36: # Standard is not defined for larger bases
+        raise TypeError(
+            'Cannot convert to or from a base larger than 36'
+        ) from TypeError
+
+    if min(new_base, original_base) < 2:
+        raise ValueError('Cannot convert to or from a base smaller than 2')
+
+
 def convert(num: str, new_base: int, original_base: int=10) -> str:
     '''
     convert(num:str, new_base:int, original_base:int=10)
-    
+
     Takes a string number and converts it to a new base from an
     original base, supplied as integers. Returns number as a string in
     the new base. Cannot convert to or from a base larger than 36.
+    Raises ValueError if a base is smaller than 2, or num has a
+    character that is not a digit of the original base.
     '''
 
-    largest_base = max(new_base, original_base) 
+    check_bases(new_base, original_base)
 
-    if largest_base > 36: # Standard is not defined for larger bases
-        raise TypeError(
-            'Cannot convert to or from a base larger than 36'
-        ) from TypeError
+    if num.translate(DIGIT_CHECKS[original_base]):
+        raise ValueError(
+            f'{num!r} is not a number in base {original_base}'
+        )
+
+    value = parse_number(num, original_base) if num else 0
+
+    return format_number(value, new_base)
+
+
+def parse_array(array, base: int):
+    '''
+    parse_array(array, base:int)
+
+    Returns the values of a NumPy array of strings (str or bytes) in a
+    base as an array of 64-bit unsigned integers, reading one column of
+    digits of every string at a time. Returns None if the strings are
+    too long for every value to fit in 64 bits.
+    '''
+    array = numpy.ascontiguousarray(array).ravel()
+    code_size = 4 if array.dtype.kind == "U" else 1
+    width = array.dtype.itemsize // code_size
+
+    if base ** width > 1 << 64:
+        return None
+
+    values = numpy.zeros(len(array), numpy.uint64)
+    if not width:
+        return values
+
+    codes = array.view(numpy.uint32 if code_size == 4 else numpy.uint8)
+    codes = numpy.minimum(codes.reshape(len(array), width), 128)
+    digits = ARRAY_DIGIT_VALUES[base][codes]
 
-    values = "0123456789abcdefghijklmnopqrstuvwxyz"
-    value_dict = {values[i]: i
-        for i in range(largest_base)
-    }
+    bad = (digits == INVALID).any(axis=1)
+    if bad.any():
+        raise ValueError(
+            f'{array[bad.argmax()].item()!r} is not a number in base {base}'
+        )
 
-    x = num.lower()
+    multiplier = numpy.uint64(base)
+    for column in digits.T:
+        values = numpy.where(column == PADDING, values,
+            values * multiplier + column.astype(numpy.uint64))
 
-    # Converts string from original base to numeric value
-    accu = 0
-    rev = x[::-1]
-    for i in range(len(rev)):
-        accu += value_dict[rev[i]] * (original_base**i)
+    return values
 
-    key_dict = {i: values[i] for i in range(len((values)))}
 
-    # Converts numeric value to string of new base
-    i = 0
-    rem = accu
-    str_val = "" if rem > 0 else "0"
-    while rem > 0:
-        str_val = key_dict[rem % new_base] + str_val
-        rem = rem // new_base
-        i += 1
+def format_array(values, base: int) -> list:
+    '''
+    format_array(values, base:int)
+
+    Returns a list of the values in a NumPy array of 64-bit unsigned
+    integers written in a base, taking one column of digits off every
+    value at a time.
+    '''
+    width = len(format_number(int(values.max()), base))
+    digits = numpy.empty((len(values), width), numpy.uint8)
+    divisor = numpy.uint64(base)
+
+    rest = values.copy()
+    for column in range(width - 1, -1, -1):
+        digits[:, column] = DIGIT_CODES[rest % divisor]
+        rest //= divisor
+
+    text = numpy.char.lstrip(digits.view(f"S{width}").ravel(), b"0")
+    text = text.astype(str)
+    return numpy.where(text == "", "0", text).tolist()
+
+
+def batch_values(batch, base: int):
+    '''
+    batch_values(batch, base:int)
+
+    Returns the values of a batch of numbers (strings in a base, or
+    non-negative integers), as a NumPy array of 64-bit unsigned
+    integers if NumPy could read them all at once, or else as a list.
+    '''
+    if numpy is not None:
+        if not isinstance(batch, numpy.ndarray) and \
+                all(type(value) is str for value in batch):
+            batch = numpy.array(batch, dtype=str)
+
+        if isinstance(batch, numpy.ndarray):
+            if batch.dtype.kind in "US":
+                values = parse_array(batch, base)
+                if values is not None:
+                    return values
+            elif batch.dtype.kind in "iu":
+                if batch.dtype.kind == "i" and (batch < 0).any():
+                    raise ValueError(f'{batch.min()} is negative')
+                return batch.astype(numpy.uint64).ravel()
+            batch = batch.ravel().tolist()
+
+    values = []
+
+    for value in batch:
+        if isinstance(value, bytes):
+            value = value.decode("ascii")
+
+        if isinstance(value, str):
+            if value.translate(DIGIT_CHECKS[base]):
+                raise ValueError(f'{value!r} is not a number in base {base}')
+            values.append(parse_number(value, base) if value else 0)
+        else:
+            value = index(value)
+            if value < 0:
+                raise ValueError(f'{value} is negative')
+            values.append(value)
+
+    return values
+
+
+def batch_strings(values, base: int) -> list:
+    '''
+    batch_strings(values, base:int)
+
+    Returns a list of a batch of values written in a base, with NumPy
+    when it is available and every value fits in 64 bits.
+    '''
+    if numpy is not None and not isinstance(values, numpy.ndarray):
+        try:
+            values = numpy.array(values, dtype=numpy.uint64)
+        except OverflowError:
+            pass
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return format_array(values, base)
+
+    return [format_number(value, base) for value in values]
+
+
+def convert_many(values, new_base: int, original_base: int=10,
+        batch_size: int=BATCH_SIZE):
+    '''
+    convert_many(values, new_base:int, original_base:int=10,
+        batch_size:int=4096)
+
+    Generator that converts many numbers to a new base, yielding each
+    as a string in the new base, in order. values may be any iterable
+    (or a NumPy array) of strings in the original base, or of
+    non-negative integers. Numbers are read batch_size at a time, and
+    if NumPy is installed the digits of a whole batch of numbers that
+    fit in 64 bits are worked out together. Raises the same errors as
+    convert, once the batch holding a bad number is reached.
+    '''
+
+    check_bases(new_base, original_base)
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        values = values.ravel()
+        batches = (values[start:start + batch_size]
+            for start in range(0, len(values), batch_size))
+    else:
+        iterator = iter(values)
+        batches = iter(lambda: list(islice(iterator, batch_size)), [])
+
+    for batch in batches:
+        yield from batch_strings(batch_values(batch, original_base), new_base)
+
+
+def read_chunks(source, chunk_size: int=STREAM_CHUNK):
+    '''
+    read_chunks(source, chunk_size:int=STREAM_CHUNK)
+
+    Generator yielding the text of a source chunk_size characters at a
+    time. source may be a str, an ASCII bytes-like object (such as a
+    memoryview), or a file-like object opened in text or binary mode.
+    '''
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast("B")
+        for start in range(0, len(view), chunk_size):
+            yield str(view[start:start + chunk_size], "ascii")
+
+    else:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk if isinstance(chunk, str) else str(chunk, "ascii")
+
+
+def read_digits(source, base: int, chunk_size: int=STREAM_CHUNK):
+    '''
+    read_digits(source, base:int, chunk_size:int=STREAM_CHUNK)
+
+    Generator yielding the digits of a source (see read_chunks) a
+    chunk at a time, with whitespace taken out. Raises ValueError on
+    reaching a character that is not a digit of the base.
+    '''
+    for chunk in read_chunks(source, chunk_size):
+        digits = chunk.translate(WHITESPACE)
+        if digits.translate(DIGIT_CHECKS[base]):
+            raise ValueError(
+                f'Source has a character that is not a digit of base {base}'
+            )
+        yield digits
+
+
+def write_block(digits: str, original_base: int, new_base: int, width: int) -> str:
+    '''
+    write_block(digits:str, original_base:int, new_base:int, width:int)
+
+    Returns a block of digits of one power of two base written in
+    another, as exactly width digits. Bases 2, 8 and 16 are written by
+    format(), base 4 through hexadecimal and base 32 by b32hexencode
+    (whose digits are those of base 32), so long as the block fills
+    whole hexadecimal digits or bytes.
+    '''
+    value = int(digits, original_base)
+    bits = width * POWER_BITS[new_base]
+
+    if new_base in (2, 8, 16):
+        return format(value, f"0{width}{NATIVE_FORMATS[new_base]}")
+
+    if new_base == 4 and bits % 4 == 0:
+        return format(value, f"0{bits // 4}x").translate(HEX_TO_BASE4)
+
+    if new_base == 32 and bits % 40 == 0:
+        return b32hexencode(value.to_bytes(bits // 8, "big")).decode().lower()
+
+    return format_number(value, new_base).zfill(width)
+
 
-    return str_val
+def regroup(chunks, original_base: int, new_base: int, lead: int):
+    '''
+    regroup(chunks, original_base:int, new_base:int, lead:int)
+
+    Generator converting chunks of digits between two power of two
+    bases, where every digit of the new base depends only on a fixed
+    group of bits of the old one. The digits are split into groups
+    whose bits fill a whole number of new digits, counted from the
+    end of the number, so lead is the number of digits before the
+    first whole group. Yields the digits of the new base, leading zeros
+    included.
+    '''
+    in_bits, out_bits = POWER_BITS[original_base], POWER_BITS[new_base]
+    group_bits = lcm(in_bits, out_bits, BLOCK_BITS.get(new_base, 1))
+    group = group_bits // in_bits
+    pending = ""
+
+    for chunk in chunks:
+        pending += chunk
+
+        if lead:
+            if len(pending) < lead:
+                continue
+            head, pending = pending[:lead], pending[lead:]
+            yield write_block(head, original_base, new_base,
+                -(-lead * in_bits // out_bits))
+            lead = 0
+
+        usable = len(pending) - len(pending) % group
+        if usable:
+            yield write_block(pending[:usable], original_base, new_base,
+                usable * in_bits // out_bits)
+            pending = pending[usable:]
+
+    if lead or pending: # The digits did not fill the groups they were counted in
+        raise ValueError('Source changed while it was being converted')
+
+
+def iter_convert(source, new_base: int, original_base: int=10,
+        chunk_size: int=STREAM_CHUNK):
+    '''
+    iter_convert(source, new_base:int, original_base:int=10,
+        chunk_size:int=STREAM_CHUNK)
+
+    Generator that converts a number read from a source (see
+    read_chunks) to a new base, yielding the digits of the new base a
+    chunk at a time, without leading zeros. Whitespace in the source
+    (such as the line breaks of a dump) is skipped. Raises the same
+    errors as convert.
+
+    If both bases are powers of two, digits are regrouped as they are
+    read (see regroup), so memory use does not grow with the number.
+    Unless every old digit makes whole new digits (as from base 16 to
+    base 2), the digits are first counted, reading the source twice:
+    file-like sources that cannot seek are read into memory instead.
+    Other bases read the whole number and convert it as convert does.
+    '''
+
+    check_bases(new_base, original_base)
+
+    if original_base not in POWER_BITS or new_base not in POWER_BITS:
+        num = "".join(read_digits(source, original_base, chunk_size))
+        value = parse_number(num, original_base) if num else 0
+        text = format_number(value, new_base)
+        for start in range(0, len(text), chunk_size):
+            yield text[start:start + chunk_size]
+        return
+
+    in_bits, out_bits = POWER_BITS[original_base], POWER_BITS[new_base]
+    group = lcm(in_bits, out_bits, BLOCK_BITS.get(new_base, 1)) // in_bits
+    lead = 0
+
+    if group > 1:
+        if not isinstance(source, (str, bytes, bytearray, memoryview)):
+            if source.seekable():
+                start = source.tell()
+                count = sum(len(digits) for digits
+                    in read_digits(source, original_base, chunk_size))
+                source.seek(start)
+            else:
+                source = "".join(read_digits(source, original_base, chunk_size))
+                count = len(source)
+        else:
+            count = sum(len(digits) for digits
+                in read_digits(source, original_base, chunk_size))
+        lead = count % group
+
+    started = False
+
+    for piece in regroup(read_digits(source, original_base, chunk_size),
+            original_base, new_base, lead):
+        if not started:
+            piece = piece.lstrip("0")
+            if not piece:
+                continue
+            started = True
+        yield piece
+
+    if not started:
+        yield "0"
+
+
+def convert_stream(source, destination, new_base: int, original_base: int=10,
+        chunk_size: int=STREAM_CHUNK) -> int:
+    '''
+    convert_stream(source, destination, new_base:int, original_base:int=10,
+        chunk_size:int=STREAM_CHUNK)
+
+    Converts a number read from a source to a new base as iter_convert
+    does, writing the digits to a file-like destination (in text or
+    binary mode) as they are made. Returns the number of digits
+    written.
+    '''
+    binary = not isinstance(destination, TextIOBase)
+    written = 0
+
+    for piece in iter_convert(source, new_base, original_base, chunk_size):
+        destination.write(piece.encode("ascii") if binary else piece)
+        written += len(piece)
+
+    return written
+
+
+class Codec(object):
+    '''
+    class Codec(alphabet:str, base:int=None)
+
+    Converts numbers to and from a base written with a custom alphabet,
+    where the character at index i of the alphabet is the digit i (such
+    as BASE58, BASE62 or BASE64). base defaults to the length of the
+    alphabet, and a smaller base uses its first base characters. Digits
+    are case sensitive. The tables for the alphabet are built once,
+    when the codec is made, so codecs should be kept (get_codec keeps
+    them) rather than made for each number.
+
+    Raises ValueError if base is not between 2 and 256, the alphabet is
+    shorter than base, or it repeats a character.
+    '''
+
+    def __init__(self, alphabet: str, base: int=None):
+        base = len(alphabet) if base is None else base
+
+        if not 2 <= base <= 256:
+            raise ValueError('Codec bases must be between 2 and 256')
+        if len(alphabet) < base:
+            raise ValueError(f'Alphabet has fewer than {base} characters')
+
+        alphabet = alphabet[:base]
+        if len(set(alphabet)) != base:
+            raise ValueError(f'Alphabet {alphabet!r} repeats a character')
+
+        self.alphabet = alphabet
+        self.base = base
+        self.check = {ord(c): None for c in alphabet}
+
+        if base <= 36: # Translate to DIGITS and use the built in conversions
+            self.to_digits = str.maketrans(alphabet, DIGITS[:base])
+            self.from_digits = str.maketrans(DIGITS[:base], alphabet)
+        else:
+            self.pairs = digit_pairs(alphabet)
+            self.values = {pair: i for i, pair in enumerate(self.pairs)}
+            self.values.update((c, i) for i, c in enumerate(alphabet))
+
+    def __repr__(self):
+        return f'Codec({self.alphabet!r})'
+
+    def encode(self, value: int) -> str:
+        '''
+        Method returns a non-negative integer written in the codec's
+        alphabet. Raises ValueError for negative values.
+        '''
+        value = index(value)
+        if value < 0:
+            raise ValueError(f'{value} is negative')
+
+        if self.base <= 36:
+            return format_number(value, self.base).translate(self.from_digits)
+
+        return format_number(value, self.base, self.pairs)
+
+    def decode(self, text: str) -> int:
+        '''
+        Method returns the value of a number written in the codec's
+        alphabet (0 for an empty string). Raises ValueError if text has
+        a character that is not in the alphabet.
+        '''
+        if text.translate(self.check):
+            raise ValueError(
+                f'{text!r} is not a number in base {self.base} '
+                f'with alphabet {self.alphabet!r}'
+            )
+
+        if not text:
+            return 0
+
+        if self.base <= 36:
+            return parse_number(text.translate(self.to_digits), self.base)
+
+        return parse_number(text, self.base, self.values)
+
+    def transcode(self, text: str, codec: "Codec") -> str:
+        '''
+        Method returns a number written in the codec's alphabet
+        rewritten in the alphabet of another codec.
+        '''
+        return codec.encode(self.decode(text))
+
+
+@lru_cache(maxsize=None)
+def get_codec(alphabet: str, base: int=None) -> Codec:
+    '''
+    get_codec(alphabet:str, base:int=None)
+
+    Returns the Codec for an alphabet and base, making it only the
+    first time it is asked for.
+    '''
+    return Codec(alphabet, base)
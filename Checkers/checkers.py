@@ -1,4 +1,89 @@
-import copy
+
+from functools import lru_cache
+
+
+STEPS = {
+    1: ((-1, -1), (-1, 1)), # White pieces move up the board
+    2: ((1, -1), (1, 1)), # Red pieces move down the board
+    3: ((-1, -1), (-1, 1), (1, -1), (1, 1)), # Kings move either way
+    4: ((-1, -1), (-1, 1), (1, -1), (1, 1)),
+} # (row, column) steps each kind of piece can move by
+
+PIECES = {"white": (1, 3), "red": (2, 4)} # Pieces belonging to each player
+
+KING_ROW = {1: 0, 2: 7} # Row on which each player's regular pieces are kinged
+
+SQUARES = [(y, x) for y in range(8) for x in range(8) if (y + x) % 2 == 1]
+    # (row, column) of each of the 32 playable squares, bit i of a bitboard
+
+SQUARE_INDEX = {square: i for i, square in enumerate(SQUARES)}
+
+COORDINATES = {f"{y}{x}": (y, x) for y in range(8) for x in range(8)}
+    # Shared (row, column) tuple for each two-digit coordinate of a move string
+
+NEIGHBOURS = {
+    piece: [tuple(
+        (SQUARE_INDEX.get((y + dy, x + dx)), SQUARE_INDEX.get((y + 2*dy, x + 2*dx)))
+        for dy, dx in steps
+    ) for y, x in SQUARES]
+    for piece, steps in STEPS.items()
+} # (step, jump) squares a piece can reach from each square, None if off the board
+
+KING_ROW_BITS = {1: 0x0000000F, 2: 0xF0000000} # The king rows as bitboards
+
+def directionShifts(step):
+    '''
+    def directionShifts(step):
+
+    Returns how bitboards move by a (row, column) step, as a list of
+    (shift, squares) pairs: the bits of the given squares move up by
+    shift places (down if negative). Squares whose step would leave
+    the board are left out.
+    '''
+    shifts = {}
+    for i, (y, x) in enumerate(SQUARES):
+        target = SQUARE_INDEX.get((y + step[0], x + step[1]))
+        if target is not None:
+            shifts[target - i] = shifts.get(target - i, 0) | 1 << i
+    return sorted(shifts.items())
+
+SHIFTS = [directionShifts(step) for step in STEPS[3]] # Indexed as STEPS[3]
+
+FORWARD = {"white": (0, 1), "red": (2, 3)} # SHIFTS regular pieces can use
+
+
+class ParsedMove(tuple):
+    '''
+    class ParsedMove(coordinates)
+
+    Move string already parsed into a tuple of (row, column)
+    coordinates. Can be passed to move, makeMove and isValidMove in
+    place of a move string, and is compared and hashed as the plain
+    tuple, so it can be looked up among the moves legalMoves returns.
+    str gives back the move string.
+    '''
+    __slots__ = ()
+
+    def __str__(self):
+        return " ".join(f"{y}{x}" for y, x in self)
+
+
+@lru_cache(maxsize=1 << 16)
+def compileMove(move):
+    '''
+    def compileMove(move):
+
+    Returns the ParsedMove for a move string, raising ValueError if it
+    cannot be parsed. Results are cached, so a move string that comes
+    up again is not parsed again.
+    '''
+    try:
+        return ParsedMove([COORDINATES[each] for each in move.split()])
+    except KeyError:
+        raise ValueError(
+            "Illegal move, cannot be parsed."
+        ) from None
+
 
 class CheckersGame () :
     '''
@@ -69,65 +154,93 @@ class CheckersGame () :
         def parseMove (self, move):
 
         Parses a string input and returns a tuple construction of the
-        input moves.
+        input moves, as a ParsedMove (see compileMove). A ParsedMove is
+        returned as it is.
         - move: Move specifications as a string
         '''
         
-        individualMoves = move.split()
-        processedMoves = []
-        
-        for each in individualMoves:
-            if len(each) != 2 or len({*each} - {'0','1','2','3','4','5','6','7'}):
-                raise ValueError(
-                    "Illegal move, cannot be parsed."
-                ) from ValueError
-                
-            grab = lambda x: int(each[x]) 
-            processedMoves.append( (grab(0), grab(1)) )
-            
-            
-        return tuple(processedMoves)
+        if isinstance(move, ParsedMove):
+            return move
+
+        return compileMove(move)
     
     def move(self, move, processed_moves=None, turn_switching=True):
         '''
         def move(self, move, processed_moves=None, turn_switching=True):
 
         Performs a given input move or set of moves recursively.
-        Can accept valid moves as string or tuple input. Assumes input
+        Can accept valid moves as string, ParsedMove or tuple input. Assumes input
         is valid. Optional parameters relevant during recursive steps
         and should not be specified by user. Mutates internal data so
         that the game reflects the move having been performed.
         '''
         
+        self.makeMove(move, processed_moves, turn_switching)
+
+    def makeMove(self, move, processed_moves=None, turn_switching=True):
+        '''
+        def makeMove(self, move, processed_moves=None, turn_switching=True):
+
+        Performs a move in the same way as move, and returns an undo
+        record that unmakeMove can use to take it back. The record is a
+        tuple of the squares changed (as (row, column, old piece)), and
+        the isWon and whoseMove values from before the move.
+        '''
+        
         if processed_moves:
             moves = processed_moves
         else:
             moves = self.parseMove(move)
+
+        board = self.board
+        changed = []
+        undo = (changed, self.isWon, self.whoseMove)
         
         for i in range(len(moves) - 1):
             
             y1, x1 = moves[i][0], moves[i][1]
             y2, x2 = moves[i+1][0], moves[i+1][1]
+
+            changed.append((y1, x1, board[y1][x1]))
+            changed.append((y2, x2, board[y2][x2]))
             
             if abs(x2-x1) == 1: # A single move, not a jump
-                self.board[y1][x1], self.board[y2][x2] = 0, self.board[y1][x1]
+                board[y1][x1], board[y2][x2] = 0, board[y1][x1]
                 
             if abs(x2-x1) == 2: # A jump
-                self.board[y1][x1], self.board[y2][x2] = 0, self.board[y1][x1] # same swap
+                board[y1][x1], board[y2][x2] = 0, board[y1][x1] # same swap
                 
                 average = lambda x, y: int(abs(x + y)/2)
                 avY, avX = average(y1, y2), average(x1, x2)
-                self.board[avY][avX] = 0 # Eliminate the jumped character
+                changed.append((avY, avX, board[avY][avX]))
+                board[avY][avX] = 0 # Eliminate the jumped character
                 
-            if self.board[y2][x2] == 1 and y2 == 0:
-                self.board[y2][x2] = 3
-            if self.board[y2][x2] == 2 and y2 == 7:
-                self.board[y2][x2] = 4
+            if board[y2][x2] == 1 and y2 == 0:
+                board[y2][x2] = 3
+            if board[y2][x2] == 2 and y2 == 7:
+                board[y2][x2] = 4
         
         self.checkWinner()
         
         if turn_switching:
             self.changeTurn()
+
+        return undo
+
+    def unmakeMove(self, undo):
+        '''
+        def unmakeMove(self, undo):
+
+        Takes back a move performed by makeMove, given the undo record
+        it returned. Moves must be taken back in the reverse of the
+        order they were made.
+        '''
+        
+        changed, self.isWon, self.whoseMove = undo
+        board = self.board
+
+        for y, x, piece in reversed(changed):
+            board[y][x] = piece
         
     def isValidMove(self, move, processed_moves=None, double_jump=False):
         '''
@@ -135,8 +248,10 @@ class CheckersGame () :
 
         Method to check if an input move is a valid moveset
         recursively. Input is taken as a string, unless pre-processed
-        moves are supplied. Returns true if it is a valid move, and
-        False if the move is invalid.
+        moves are supplied, or the input is a ParsedMove. Returns true
+        if it is a valid move, and False if the move is invalid. Only
+        jumps may be chained: a single move ends the turn. Accepts the
+        same moves as BitboardCheckersGame.isValidMove.
         '''
 
         if processed_moves:
@@ -149,7 +264,7 @@ class CheckersGame () :
             except:
                 return False
 
-        if moves == (): # No moves input
+        if len(moves) < 2: # No moves input
             return False
         
         # Get move coordinates from first two (more will be adressed later)
@@ -220,15 +335,134 @@ class CheckersGame () :
         
         else:
             
+            if abs(x2-x1) == 1: # A single move cannot be followed by more
+                return False
+            
             if self.whoseMove == "white" and y2 == 0 and pieceMoved == 1:
                 return False # It has been made a king and must stop moving
             elif self.whoseMove == "red" and y2 == 7 and pieceMoved == 2:
                 return False # It has been made a king and must stop moving
         
-            copyBoard = CheckersGame(copy.deepcopy(self.board), self.whoseMove)
-            copyBoard.move("", processed_moves = moves[:2], turn_switching = False)
+            # Make the first leg in place to check the rest, then take it back
+            undo = self.makeMove("", processed_moves = moves[:2], turn_switching = False)
             
-            return copyBoard.isValidMove("", processed_moves = moves[1:], double_jump = True)
+            try:
+                return self.isValidMove("", processed_moves = moves[1:], double_jump = True)
+            finally:
+                self.unmakeMove(undo)
+
+    def legalMoves(self):
+        '''
+        def legalMoves(self):
+
+        Returns a list of every move the current player can make, each
+        as a tuple of (row, column) coordinates in the form returned by
+        parseMove, so they can be passed straight to move as
+        processed_moves. Follows the same rules as isValidMove:
+        - A piece may step one space diagonally onto an empty space,
+            forwards only unless it is a king.
+        - A piece may jump an opposing piece onto the empty space
+            beyond it, and keep jumping from where it lands. Every
+            chain of jumps is listed, including those that stop before
+            running out of jumps, since jumping is never forced.
+        - A regular piece that reaches the far row is kinged and must
+            stop there.
+
+        Jump chains are followed on the board itself, taking captured
+        pieces off and putting them back as the search returns, so the
+        board is unchanged once the list is built.
+        '''
+        board = self.board
+        own = PIECES[self.whoseMove]
+        moves = []
+
+        for y in range(8):
+            for x in range(8):
+                piece = board[y][x]
+                if piece not in own:
+                    continue
+
+                for dy, dx in STEPS[piece]:
+                    y2, x2 = y + dy, x + dx
+                    if 0 <= y2 < 8 and 0 <= x2 < 8 and board[y2][x2] == 0:
+                        moves.append(((y, x), (y2, x2)))
+
+                board[y][x] = 0 # Lifted, so a chain may land where it began
+                self.addJumps(piece, [(y, x)], moves)
+                board[y][x] = piece
+
+        return moves
+
+    def addJumps(self, piece, path, moves):
+        '''
+        def addJumps(self, piece, path, moves):
+
+        Appends to moves every chain of jumps that continues a path of
+        (row, column) coordinates, for a piece that has been lifted off
+        the board. Used by legalMoves.
+        '''
+        board = self.board
+        y, x = path[-1]
+
+        for dy, dx in STEPS[piece]:
+            y2, x2 = y + 2*dy, x + 2*dx
+
+            if not (0 <= y2 < 8 and 0 <= x2 < 8) or board[y2][x2] != 0:
+                continue
+
+            jumped = board[y + dy][x + dx]
+            if jumped == 0 or jumped % 2 == piece % 2: # Must jump an opponent
+                continue
+
+            board[y + dy][x + dx] = 0
+            path.append((y2, x2))
+            moves.append(tuple(path))
+
+            if KING_ROW.get(piece) != y2:
+                self.addJumps(piece, path, moves)
+
+            path.pop()
+            board[y + dy][x + dx] = jumped
+
+    def formatMove(self, moves):
+        '''
+        def formatMove(self, moves):
+
+        Returns the move string for a tuple of (row, column) coordinates
+        such as legalMoves returns, undoing parseMove.
+        '''
+        return " ".join(f"{y}{x}" for y, x in moves)
+
+    def replay(self, moves):
+        '''
+        def replay(self, moves):
+
+        Plays a list of moves (as strings or ParsedMoves) in the same
+        way runGame plays a move list, without printing: moves that are
+        not valid are skipped, and play stops once the game is won.
+        Each move is parsed only once, and the parsed move is checked
+        and made. Returns a tuple of the list of ParsedMoves made and
+        the list of indices of the moves skipped.
+        '''
+        played, skipped = [], []
+
+        for index, move in enumerate(moves):
+            if self.isWon:
+                break
+
+            try:
+                parsed = self.parseMove(move)
+            except ValueError:
+                skipped.append(index)
+                continue
+
+            if self.isValidMove("", processed_moves=parsed):
+                self.makeMove("", processed_moves=parsed)
+                played.append(parsed)
+            else:
+                skipped.append(index)
+
+        return played, skipped
         
  
     # Function to print out a visual representation of the current board.
@@ -253,10 +487,240 @@ class CheckersGame () :
         out += "╚═══╧═══╧═══╧═══╧═══╧═══╧═══╧═══╝\n   0   1   2   3   4   5   6   7 \n"
         return out
 
+class BitboardCheckersGame(CheckersGame):
+    '''
+    class BitboardCheckersGame(board=False, turn="white", isWon=False)
+
+    CheckersGame that stores the board as three 32-bit masks, one bit
+    per playable square (see SQUARES): white holds the white pieces,
+    red the red pieces and kings the kings of either colour. Checking
+    for a winner or copying the game costs a few integer operations,
+    and moves are generated from the NEIGHBOURS table without touching
+    a list.
+
+    The board attribute still reads and writes an 8x8 list, so games
+    are printed and set up in the same way as CheckersGame, and moves
+    use the same strings. Reading it builds a new list each time, so
+    changes to that list do not reach the game; assign a whole board
+    instead.
+    '''
+
+    def __init__(self, board=False, turn="white", isWon=False):
+        self.white = self.red = self.kings = 0
+        super().__init__(board, turn, isWon)
+
+    @property
+    def board(self):
+        board = [[0] * 8 for _ in range(8)]
+
+        for i, (y, x) in enumerate(SQUARES):
+            bit = 1 << i
+            if self.white & bit:
+                board[y][x] = 3 if self.kings & bit else 1
+            elif self.red & bit:
+                board[y][x] = 4 if self.kings & bit else 2
+
+        return board
+
+    @board.setter
+    def board(self, board):
+        self.white = self.red = self.kings = 0
+
+        for i, (y, x) in enumerate(SQUARES):
+            piece = board[y][x]
+            if piece:
+                bit = 1 << i
+                if piece % 2:
+                    self.white |= bit
+                else:
+                    self.red |= bit
+                if piece > 2:
+                    self.kings |= bit
+
+    def __copy__(self):
+        game = BitboardCheckersGame.__new__(BitboardCheckersGame)
+        game.white, game.red, game.kings = self.white, self.red, self.kings
+        game.whoseMove, game.isWon = self.whoseMove, self.isWon
+        return game
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+    def checkWinner(self):
+        '''
+        def checkWinner(self):
+
+        Checks if either player has run out of pieces and mutates the
+        isWon value to specify the winner of the game.
+        '''
+        if not (self.white and self.red):
+            self.isWon = "white" if self.white else "red"
+
+    def pieceAt(self, i):
+        '''
+        def pieceAt(self, i):
+
+        Returns the piece (0 to 4, as on a CheckersGame board) on the
+        playable square with bit index i.
+        '''
+        bit = 1 << i
+        if self.white & bit:
+            return 3 if self.kings & bit else 1
+        if self.red & bit:
+            return 4 if self.kings & bit else 2
+        return 0
+
+    def legalMoves(self):
+        '''
+        def legalMoves(self):
+
+        Returns a list of every move the current player can make, as
+        CheckersGame.legalMoves does. Chains of jumps are followed on
+        copies of the masks, so the game itself is never changed.
+        '''
+        white = self.whoseMove == "white"
+        own, enemy = (self.white, self.red) if white else (self.red, self.white)
+        occupied = own | enemy
+        empty = ~occupied
+        forward = FORWARD[self.whoseMove]
+        moves = []
+        jumping = False
+
+        # Steps are found a direction at a time for every piece at once
+        for direction, shifts in enumerate(SHIFTS):
+            movers = own if direction in forward else own & self.kings
+            over = 0
+
+            for shift, squares in shifts:
+                sources = movers & squares
+                reached = sources << shift if shift > 0 else sources >> -shift
+                targets = reached & empty
+                over |= reached & occupied
+
+                while targets:
+                    low = targets & -targets
+                    targets ^= low
+                    end = low.bit_length() - 1
+                    moves.append((SQUARES[end - shift], SQUARES[end]))
+
+            if not jumping and over & enemy:
+                for shift, squares in shifts:
+                    landing = over & enemy & squares
+                    if (landing << shift if shift > 0 else
+                            landing >> -shift) & empty:
+                        jumping = True
+
+        if not jumping:
+            return moves
+
+        pieces = own
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            i = low.bit_length() - 1
+
+            piece = (1 if white else 2) + (2 if self.kings & low else 0)
+            self.addJumps(piece, [SQUARES[i]], i, occupied ^ low, enemy, moves)
+
+        return moves
+
+    def addJumps(self, piece, path, i, occupied, enemy, moves):
+        '''
+        def addJumps(self, piece, path, i, occupied, enemy, moves):
+
+        Appends to moves every chain of jumps that continues a path
+        ending on square i, given masks of the occupied squares (not
+        counting the moving piece) and of the opposing pieces left.
+        '''
+        for over, land in NEIGHBOURS[piece][i]:
+            if land is None or occupied >> land & 1 or not enemy >> over & 1:
+                continue
+
+            path.append(SQUARES[land])
+            moves.append(tuple(path))
+
+            if not KING_ROW_BITS.get(piece, 0) >> land & 1:
+                captured = ~(1 << over)
+                self.addJumps(piece, path, land, occupied & captured,
+                    enemy & captured, moves)
+
+            path.pop()
+
+    def makeMove(self, move, processed_moves=None, turn_switching=True):
+        '''
+        def makeMove(self, move, processed_moves=None, turn_switching=True):
+
+        Performs a given input move or set of moves, as
+        CheckersGame.makeMove does, by updating the masks. The undo
+        record returned holds the masks, isWon and whoseMove from
+        before the move.
+        '''
+        undo = (self.white, self.red, self.kings, self.isWon, self.whoseMove)
+        moves = processed_moves if processed_moves else self.parseMove(move)
+
+        for (y1, x1), (y2, x2) in zip(moves, moves[1:]):
+            start, end = 1 << SQUARE_INDEX[(y1, x1)], 1 << SQUARE_INDEX[(y2, x2)]
+            king = self.kings & start
+
+            if self.white & start:
+                self.white ^= start | end
+                crown = KING_ROW_BITS[1]
+            else:
+                self.red ^= start | end
+                crown = KING_ROW_BITS[2]
+
+            if abs(x2 - x1) == 2: # A jump, eliminate the jumped piece
+                over = ~(1 << SQUARE_INDEX[((y1 + y2) // 2, (x1 + x2) // 2)])
+                self.white &= over
+                self.red &= over
+                self.kings &= over
+
+            self.kings &= ~start
+            if king or crown & end:
+                self.kings |= end
+
+        self.checkWinner()
+
+        if turn_switching:
+            self.changeTurn()
+
+        return undo
+
+    def unmakeMove(self, undo):
+        '''
+        def unmakeMove(self, undo):
+
+        Takes back a move performed by makeMove, given the undo record
+        it returned.
+        '''
+        self.white, self.red, self.kings, self.isWon, self.whoseMove = undo
+
+    def isValidMove(self, move, processed_moves=None, double_jump=False):
+        '''
+        def isValidMove(self, move, processed_moves=None, double_jump=False):
+
+        Returns True if an input move (as a string, unless pre-processed
+        moves are supplied) is one of the moves listed by legalMoves,
+        and False otherwise.
+        '''
+        if processed_moves:
+            moves = processed_moves
+        else:
+            try:
+                moves = self.parseMove(move)
+            except ValueError:
+                return False
+
+        return tuple(moves) in self.legalMoves()
+
+
 # Function to run a game of checkers from a predefined list of moves or through an interactive console game.
 # Original method supplied by Mark Hutchison and Dr. Nicholas Moore from the 1MD3 Course 2022
-def runGame (init = False, moveList = False) :
-    game = CheckersGame()
+# Pass bitboard = True to play on a BitboardCheckersGame, and players to let the computer
+# play: a dictionary mapping "white" and/or "red" to players with a chooseMove(game) method
+# (such as engine.AlphaBetaPlayer) that returns a move tuple, or None if it has no moves.
+def runGame (init = False, moveList = False, bitboard = False, players = None) :
+    game = BitboardCheckersGame() if bitboard else CheckersGame()
 
     if (init != False) :
         game.board = init
@@ -285,7 +749,16 @@ def runGame (init = False, moveList = False) :
     print("When performing multiple jumps, enter each co-ordinate your piece will land on in sequence.")
     while (game.isWon == False) :
         print(f"{game.whoseMove} to move")
-        move = input(">> ")
+        if (players and game.whoseMove in players) :
+            chosen = players[game.whoseMove].chooseMove(game)
+            if (chosen is None) : # No moves left, so the other player wins
+                game.changeTurn()
+                game.isWon = game.whoseMove
+                break
+            move = game.formatMove(chosen)
+            print(f">> {move}")
+        else :
+            move = input(">> ")
         if (move == "q") :
             return
         if (move == "r") :
@@ -361,4 +834,5 @@ moves = [ '50 41'
 , '12 34 16'
 ]
 
-runGame(moveList = moves)
\ No newline at end of file
+if __name__ == "__main__":
+    runGame(moveList = moves)
\ No newline at end of file
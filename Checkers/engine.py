@@ -0,0 +1,524 @@
+'''
+Computer player for CheckersGame.
+
+AlphaBetaPlayer searches a position with iterative-deepening alpha-beta
+(negamax) until its time budget runs out, and reports how deep it got
+and how many nodes per second it searched. Positions are keyed by
+Zobrist hashes that are updated from the undo record of every move,
+and searched positions are kept in a fixed-size transposition table.
+Moves are ordered with the table's best move first, then captures
+(longest chains first), then quiet moves by their history score.
+
+Searches run on a BitboardCheckersGame copy of the game, so the game
+passed in is never changed. Can be run from the command line to watch
+an engine-vs-engine game, or to play against the engine:
+
+    python engine.py --time 0.5 --plies 100
+    python engine.py --play white
+'''
+import argparse
+import random
+import time
+
+from checkers import BitboardCheckersGame, runGame
+
+
+WIN = 100000 # Score of a won position, less the plies taken to win it
+
+PIECE_VALUES = {1: 100, 2: 100, 3: 160, 4: 160}
+
+ADVANCED = {"white": 0x00000FFF, "red": 0xFFF00000}
+    # Squares within three rows of a player's king row
+
+EXACT, LOWER, UPPER = 0, 1, 2 # How a stored score bounds the true score
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def popCount(mask):
+    return bin(mask).count("1")
+
+
+def zobristKeys(seed=0):
+    '''
+    def zobristKeys(seed=0):
+
+    Returns random 64-bit Zobrist keys as a tuple of a dictionary of
+    keys[piece][square] (for pieces 1 to 4 on the 32 playable squares)
+    and the key xored in when red is to move.
+    '''
+    rng = random.Random(seed)
+    keys = {piece: [rng.getrandbits(64) for _ in range(32)]
+        for piece in (1, 2, 3, 4)}
+    return keys, rng.getrandbits(64)
+
+
+class SearchResult(object):
+    '''
+    class SearchResult(move, score, depth, nodes, seconds)
+
+    Outcome of AlphaBetaPlayer.search.
+    - move: Best move found, as a tuple of (row, column) coordinates,
+        or None if the side to move has no moves.
+    - score: Score of the move for the side to move, in hundredths of
+        a regular piece. Scores near WIN are forced wins (or losses,
+        if negative).
+    - depth: Deepest search completed, in plies.
+    - nodes, seconds: Positions searched and time taken.
+    '''
+
+    def __init__(self, move, score, depth, nodes, seconds):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+
+    @property
+    def nodesPerSecond(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        move = " ".join(f"{y}{x}" for y, x in self.move) if self.move else "-"
+        return (
+            f"move {move} score {self.score} depth {self.depth} "
+            f"nodes {self.nodes} ({self.nodesPerSecond:.0f} nps) "
+            f"in {self.seconds:.3f}s"
+        )
+
+
+class TranspositionTable(object):
+    '''
+    class TranspositionTable(size=1 << 20)
+
+    Fixed-size table of searched positions, indexed by the low bits of
+    their Zobrist keys. Each slot holds one entry,
+    (key, depth, score, flag, move); a new entry replaces the old one
+    unless the old one is for another position searched deeper. size
+    is rounded down to a power of two.
+    '''
+
+    def __init__(self, size=1 << 20):
+        size = 1 << max(size, 1).bit_length() - 1
+        self.mask = size - 1
+        self.entries = [None] * size
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        '''
+        Returns the entry stored for a key, or None.
+        '''
+        entry = self.entries[key & self.mask]
+        return entry if entry is not None and entry[0] == key else None
+
+    def put(self, key, depth, score, flag, move):
+        '''
+        Stores an entry for a key, unless its slot holds a deeper
+        search of another position.
+        '''
+        index = key & self.mask
+        old = self.entries[index]
+
+        if old is None or old[0] == key or old[1] <= depth:
+            self.entries[index] = (key, depth, score, flag, move)
+
+    def clear(self):
+        self.entries = [None] * len(self.entries)
+
+
+class AlphaBetaPlayer(object):
+    '''
+    class AlphaBetaPlayer(timeLimit=1.0, maxDepth=64, tableSize=1 << 20, seed=0,
+        tablebase=None)
+
+    Computer player that picks moves by alpha-beta search. Optional
+    parameters:
+    - timeLimit: Seconds to search each move for.
+    - maxDepth: Deepest search tried, in plies.
+    - tableSize: Number of transposition table slots.
+    - seed: Seed for the Zobrist keys.
+    - tablebase: Endgame Tablebase (see tablebase.py) whose results
+        are used instead of searching positions with few enough pieces.
+
+    A player that has no moves, or no pieces, loses. Captures are not
+    forced, so the search ends in a quiescence search of captures to
+    avoid stopping in the middle of an exchange. Positions that repeat
+    one already reached in the game (as seen by this player) or
+    earlier in the line being searched are scored as draws, so a
+    player that is ahead looks for progress. The table, history scores
+    and positions seen are kept between moves; call newGame to clear
+    them.
+    '''
+
+    def __init__(self, timeLimit=1.0, maxDepth=64, tableSize=1 << 20, seed=0,
+            tablebase=None):
+        self.timeLimit = timeLimit
+        self.maxDepth = maxDepth
+        self.tablebase = tablebase
+        self.table = TranspositionTable(tableSize)
+        self.keys, self.redKey = zobristKeys(seed)
+        self.history = {}
+        self.seen = set()
+        self.path = set()
+        self.nodes = 0
+        self.deadline = None
+        self.lastResult = None
+
+    def newGame(self):
+        '''
+        Clears the transposition table, history scores and the
+        positions seen in the game.
+        '''
+        self.table.clear()
+        self.history = {}
+        self.seen = set()
+
+    def chooseMove(self, game):
+        '''
+        Returns the move to play in a game, as a tuple of (row, column)
+        coordinates (see CheckersGame.formatMove), or None if the
+        player to move has no moves.
+        '''
+        return self.search(game).move
+
+    def hashPosition(self, game):
+        '''
+        Returns the Zobrist key of a BitboardCheckersGame position.
+        '''
+        key = self.redKey if game.whoseMove == "red" else 0
+
+        for i in range(32):
+            piece = game.pieceAt(i)
+            if piece:
+                key ^= self.keys[piece][i]
+
+        return key
+
+    def updateKey(self, key, undo, game):
+        '''
+        Returns the Zobrist key of a position after a move, given the
+        key before it and the undo record makeMove returned for it.
+        Only the squares whose pieces changed are looked at.
+        '''
+        white, red, kings = undo[0], undo[1], undo[2]
+        changed = (white ^ game.white) | (red ^ game.red) | (kings ^ game.kings)
+
+        while changed:
+            low = changed & -changed
+            changed ^= low
+            i = low.bit_length() - 1
+
+            if (white | red) & low:
+                before = (1 if white & low else 2) + (2 if kings & low else 0)
+                key ^= self.keys[before][i]
+            if (game.white | game.red) & low:
+                key ^= self.keys[game.pieceAt(i)][i]
+
+        if undo[4] != game.whoseMove:
+            key ^= self.redKey
+
+        return key
+
+    def evaluate(self, game):
+        '''
+        Returns the score of a position for the side to move: material,
+        with kings worth more than regular pieces, and a bonus for
+        regular pieces close to being kinged. The side that is ahead
+        gains a little for every piece taken off the board, so that it
+        trades down towards a win instead of shuffling its kings.
+        '''
+        kings = game.kings
+        white = PIECE_VALUES[1] * popCount(game.white & ~kings) + \
+            PIECE_VALUES[3] * popCount(game.white & kings) + \
+            10 * popCount(game.white & ~kings & ADVANCED["white"])
+        red = PIECE_VALUES[2] * popCount(game.red & ~kings) + \
+            PIECE_VALUES[4] * popCount(game.red & kings) + \
+            10 * popCount(game.red & ~kings & ADVANCED["red"])
+
+        score = white - red
+        taken = 24 - popCount(game.white | game.red)
+        if score > 0:
+            score += 4 * taken
+        elif score < 0:
+            score -= 4 * taken
+
+        return score if game.whoseMove == "white" else -score
+
+    def isCapture(self, move):
+        return abs(move[1][0] - move[0][0]) == 2
+
+    def orderMoves(self, moves, best=None):
+        '''
+        Returns moves sorted with best first, then captures (longest
+        first), then other moves by their history score.
+        '''
+        history = self.history
+
+        def key(move):
+            if move == best:
+                return (0, 0)
+            if self.isCapture(move):
+                return (1, -len(move))
+            return (2, -history.get(move, 0))
+
+        return sorted(moves, key=key)
+
+    def tick(self):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+    def wonScore(self, game, ply):
+        '''
+        Returns the score for the side to move if the game has been
+        won, or None if it has not.
+        '''
+        if not game.isWon:
+            return None
+        return WIN - ply if game.isWon == game.whoseMove else ply - WIN
+
+    def quiescence(self, game, key, alpha, beta, ply):
+        '''
+        Searches only captures from a position, taking the static
+        evaluation as the score if it is better than every capture.
+        '''
+        self.tick()
+
+        won = self.wonScore(game, ply)
+        if won is not None:
+            return won
+
+        best = self.evaluate(game)
+        if best >= beta:
+            return best
+        alpha = max(alpha, best)
+
+        captures = [move for move in game.legalMoves() if self.isCapture(move)]
+
+        for move in self.orderMoves(captures):
+            undo = game.makeMove("", processed_moves=move)
+            score = -self.quiescence(game, None, -beta, -alpha, ply + 1)
+            game.unmakeMove(undo)
+
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return best
+
+    def negamax(self, game, key, depth, alpha, beta, ply):
+        '''
+        Returns the score of a position for the side to move, searched
+        depth plies deep, between the bounds alpha and beta.
+        '''
+        self.tick()
+
+        won = self.wonScore(game, ply)
+        if won is not None:
+            return won
+
+        if key in self.path or key in self.seen:
+            return 0
+
+        if self.tablebase is not None:
+            known = self.tablebase.lookup(game.white, game.red, game.kings,
+                game.whoseMove)
+            if known is not None:
+                result, plies = known
+                if result == "draw":
+                    return 0
+                return WIN - ply - plies if result == "win" \
+                    else ply + plies - WIN
+
+        if depth <= 0:
+            return self.quiescence(game, key, alpha, beta, ply)
+
+        original = alpha
+        bestMove = None
+        entry = self.table.get(key)
+
+        if entry is not None:
+            bestMove = entry[4]
+
+            if entry[1] >= depth:
+                score = self.fromTable(entry[2], ply)
+                if entry[3] == EXACT:
+                    return score
+                if entry[3] == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        moves = game.legalMoves()
+        if not moves:
+            return ply - WIN
+
+        best = -WIN - 1
+        self.path.add(key)
+
+        for move in self.orderMoves(moves, bestMove):
+            undo = game.makeMove("", processed_moves=move)
+            score = -self.negamax(game, self.updateKey(key, undo, game),
+                depth - 1, -beta, -alpha, ply + 1)
+            game.unmakeMove(undo)
+
+            if score > best:
+                best, bestMove = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not self.isCapture(move):
+                            self.history[move] = \
+                                self.history.get(move, 0) + depth * depth
+                        break
+
+        self.path.discard(key)
+        flag = UPPER if best <= original else LOWER if best >= beta else EXACT
+        self.table.put(key, depth, self.toTable(best, ply), flag, bestMove)
+        return best
+
+    def toTable(self, score, ply):
+        '''
+        Converts a score to be stored in the table: forced wins are
+        counted from the stored position rather than from the root.
+        '''
+        if score > WIN - 1000:
+            return score + ply
+        if score < 1000 - WIN:
+            return score - ply
+        return score
+
+    def fromTable(self, score, ply):
+        if score > WIN - 1000:
+            return score - ply
+        if score < 1000 - WIN:
+            return score + ply
+        return score
+
+    def searchRoot(self, game, key, depth, moves):
+        '''
+        Searches every root move depth plies deep and returns a tuple of
+        the best score and move.
+        '''
+        alpha, beta = -WIN - 1, WIN + 1
+        best, bestMove = -WIN - 1, moves[0]
+
+        for move in moves:
+            undo = game.makeMove("", processed_moves=move)
+            score = -self.negamax(game, self.updateKey(key, undo, game),
+                depth - 1, -beta, -alpha, 1)
+            game.unmakeMove(undo)
+
+            if score > best:
+                best, bestMove = score, move
+                alpha = max(alpha, score)
+
+        self.table.put(key, depth, self.toTable(best, 0), EXACT, bestMove)
+        return best, bestMove
+
+    def search(self, game):
+        '''
+        Searches a game's position one ply deeper at a time until the
+        time limit or maxDepth is reached, or a forced result is found.
+        Returns a SearchResult for the deepest search completed (the
+        first ply is always completed), and keeps it as lastResult.
+        '''
+        root = BitboardCheckersGame(game.board, game.whoseMove, game.isWon)
+        key = self.hashPosition(root)
+        moves = root.legalMoves()
+
+        start = time.perf_counter()
+        self.nodes = 0
+        self.seen.add(key)
+        result = SearchResult(None, -WIN, 0, 0, 0.0)
+
+        for depth in range(1, self.maxDepth + 1):
+            if not moves:
+                break
+
+            # The first ply always finishes, so there is a move to play
+            self.deadline = start + self.timeLimit if depth > 1 \
+                else float("inf")
+
+            entry = self.table.get(key)
+            ordered = self.orderMoves(moves, entry[4] if entry else None)
+
+            try:
+                score, move = self.searchRoot(root, key, depth, ordered)
+            except SearchTimeout:
+                break
+            finally:
+                self.path.clear()
+
+            result = SearchResult(move, score, depth, self.nodes,
+                time.perf_counter() - start)
+
+            if abs(score) > WIN - 1000:
+                break
+
+        result.nodes, result.seconds = self.nodes, time.perf_counter() - start
+        self.lastResult = result
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Watch or play against the checkers engine."
+    )
+    parser.add_argument("-t", "--time", type=float, default=1.0,
+        help="seconds to search each move (default: 1.0)")
+    parser.add_argument("-d", "--depth", type=int, default=64,
+        help="deepest search in plies (default: 64)")
+    parser.add_argument("--plies", type=int, default=200,
+        help="stop an engine game after this many plies (default: 200)")
+    parser.add_argument("--table-size", type=int, default=1 << 20,
+        help="transposition table slots (default: 1048576)")
+    parser.add_argument("--play", choices=("white", "red"),
+        help="play against the engine as this colour")
+    parser.add_argument("--tablebase",
+        help="endgame tablebase file to look positions up in")
+    args = parser.parse_args(argv)
+
+    tablebase = None
+    if args.tablebase:
+        from tablebase import Tablebase
+        tablebase = Tablebase.open(args.tablebase)
+
+    player = AlphaBetaPlayer(args.time, args.depth, args.table_size,
+        tablebase=tablebase)
+
+    if args.play:
+        engineColour = "red" if args.play == "white" else "white"
+        runGame(bitboard=True, players={engineColour: player})
+        return
+
+    game = BitboardCheckersGame()
+
+    for ply in range(args.plies):
+        result = player.search(game)
+        if result.move is None:
+            game.changeTurn()
+            game.isWon = game.whoseMove
+            break
+
+        print(f"{game.whoseMove:<6}{result}", flush=True)
+        game.move("", processed_moves=result.move)
+
+        if game.isWon:
+            break
+
+    print(game)
+    print(f"Result: {game.isWon or 'no winner'} after {ply + 1} plies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+'''
+Headless batch play of checkers games.
+
+Games are played across a pool of worker processes, either replayed
+from scripted move lists or played out between two engine players, and
+a compact record of each game is written out as a line of JSON as soon
+as it finishes. Nothing is printed while games are being played.
+
+    python selfplay.py --games 100 --time 0.05 --workers 4 --output games.jsonl
+    python selfplay.py --file scripted_games.json
+'''
+import argparse
+import json
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+from checkers import BitboardCheckersGame, moves as sampleMoves
+from engine import AlphaBetaPlayer
+
+
+def readGames(fileName):
+    '''
+    def readGames(fileName):
+
+    Returns a list of (name, move list) pairs from a JSON file of
+    scripted games: an object mapping names to lists of move strings.
+    '''
+    with open(fileName, "r") as fh:
+        return [(str(name), list(moveList))
+            for name, moveList in json.load(fh).items()]
+
+
+def playScripted(name, moveList):
+    '''
+    def playScripted(name, moveList):
+
+    Replays a list of move strings with CheckersGame.replay, skipping
+    any move that is not valid, and returns the game's record (see
+    playJob).
+    '''
+    game = BitboardCheckersGame()
+    start = time.perf_counter()
+    played, invalid = game.replay(moveList)
+    played = [str(move) for move in played]
+
+    return {
+        'game': name,
+        'moves': played,
+        'result': game.isWon or None,
+        'plies': len(played),
+        'seconds': time.perf_counter() - start,
+        'invalid': invalid,
+    }
+
+
+def playEngines(name, seed=0, timeLimit=0.05, maxDepth=64, maxPlies=200,
+        randomPlies=4, tableSize=1 << 16):
+    '''
+    def playEngines(name, seed=0, timeLimit=0.05, maxDepth=64, maxPlies=200,
+        randomPlies=4, tableSize=1 << 16):
+
+    Plays a game between two AlphaBetaPlayers and returns its record
+    (see playJob). The first randomPlies moves are picked at random
+    (from seed) so that games differ. A player with no moves loses, and
+    a game still going after maxPlies plies is a draw.
+    '''
+    rng = random.Random(seed)
+    players = {
+        colour: AlphaBetaPlayer(timeLimit, maxDepth, tableSize)
+        for colour in ("white", "red")
+    }
+    thinking = {"white": 0.0, "red": 0.0}
+    nodes = 0
+
+    game = BitboardCheckersGame()
+    played = []
+    start = time.perf_counter()
+
+    while not game.isWon and len(played) < maxPlies:
+        colour = game.whoseMove
+
+        if len(played) < randomPlies:
+            options = game.legalMoves()
+            move = rng.choice(options) if options else None
+        else:
+            result = players[colour].search(game)
+            move = result.move
+            thinking[colour] += result.seconds
+            nodes += result.nodes
+
+        if move is None: # No moves left, so the other player wins
+            game.isWon = "red" if colour == "white" else "white"
+            break
+
+        game.move("", processed_moves=move)
+        played.append(game.formatMove(move))
+
+    seconds = time.perf_counter() - start
+
+    return {
+        'game': name,
+        'moves': played,
+        'result': game.isWon or "draw",
+        'plies': len(played),
+        'seconds': seconds,
+        'thinking': thinking,
+        'nodes': nodes,
+        'nps': nodes / seconds if seconds else 0.0,
+    }
+
+
+def playJob(job):
+    '''
+    def playJob(job):
+
+    Plays a single job and returns the game's record, a dictionary:
+    {
+        'game': name,
+        'moves': list of the move strings played,
+        'result': "white", "red", "draw" (engine games that reach the
+            ply limit) or None (scripted games with no winner),
+        'plies': number of moves played,
+        'seconds': float
+    }
+    Scripted games also list the indices of their 'invalid' moves.
+    Engine games add the seconds each side spent 'thinking', and the
+    'nodes' searched and nodes per second ('nps').
+
+    A job is a tuple of ("script", name, move list) or
+    ("engine", name, seed, options), where options is a dictionary of
+    keyword arguments for playEngines. Runs inside the worker processes
+    of playAll.
+    '''
+    if job[0] == "script":
+        return playScripted(job[1], job[2])
+    return playEngines(job[1], job[2], **job[3])
+
+
+def playAll(jobs, workers=None):
+    '''
+    def playAll(jobs, workers=None):
+
+    Generator that plays an iterable of jobs (see playJob) across
+    workers processes (default one per CPU), and yields each game's
+    record as soon as it finishes.
+    '''
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(playJob, jobs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Play checkers games in parallel without a display."
+    )
+    parser.add_argument("-f", "--file",
+        help="JSON file of scripted games to replay")
+    parser.add_argument("--sample", action="store_true",
+        help="replay the sample game from checkers.py")
+    parser.add_argument("-n", "--games", type=int, default=10,
+        help="number of engine games to play (default: 10)")
+    parser.add_argument("-t", "--time", type=float, default=0.05,
+        help="seconds each engine searches a move for (default: 0.05)")
+    parser.add_argument("-d", "--depth", type=int, default=64,
+        help="deepest engine search in plies (default: 64)")
+    parser.add_argument("--plies", type=int, default=200,
+        help="engine games are drawn after this many plies (default: 200)")
+    parser.add_argument("--random-plies", type=int, default=4,
+        help="opening moves picked at random (default: 4)")
+    parser.add_argument("--table-size", type=int, default=1 << 16,
+        help="transposition table slots per engine (default: 65536)")
+    parser.add_argument("--seed", type=int, default=0,
+        help="seed of the first engine game, counting up (default: 0)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+        help="number of worker processes (default: one per CPU)")
+    parser.add_argument("-o", "--output", default="-",
+        help="file to write JSON lines records to (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        jobs = (("script", name, moveList)
+            for name, moveList in readGames(args.file))
+    elif args.sample:
+        jobs = iter([("script", "sample", sampleMoves)])
+    else:
+        options = {
+            'timeLimit': args.time,
+            'maxDepth': args.depth,
+            'maxPlies': args.plies,
+            'randomPlies': args.random_plies,
+            'tableSize': args.table_size,
+        }
+        jobs = (("engine", f"engine_{args.seed + number}",
+            args.seed + number, options) for number in range(args.games))
+
+    start = time.perf_counter()
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    results = {}
+
+    try:
+        for record in playAll(jobs, args.workers):
+            print(json.dumps(record, separators=(",", ":")), file=output,
+                flush=True)
+            results[record['result']] = results.get(record['result'], 0) + 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    summary = ", ".join(f"{result}: {count}" for result, count in results.items())
+    print(
+        f"Played {sum(results.values())} games in "
+        f"{time.perf_counter() - start:.3f}s ({summary})",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
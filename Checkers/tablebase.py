@@ -0,0 +1,443 @@
+'''
+Endgame tablebases for checkers.
+
+A tablebase holds the result of every position with up to maxPieces
+pieces on the board, under the rules of CheckersGame.legalMoves: win,
+loss or draw for the player to move, and for wins and losses the
+number of plies the game lasts with best play (the winner finishing
+as fast as it can and the loser holding out as long as it can). A
+player that has no moves, or no pieces, has lost.
+
+Tables are built by retrograde analysis, from the positions that are
+already decided back to the ones that lead to them, one material
+balance at a time. Captures and promotions always lead to a material
+balance that has been built already, so only quiet moves link the
+positions being solved.
+
+Only positions with white to move are stored: a position with red to
+move is looked up by turning the board round and swapping the
+colours. Each material balance is a slice of the table, indexed by
+the combination of squares each group of pieces stands on, and every
+position is one unsigned 16-bit value, so a table is saved as a flat
+file that is memory-mapped when opened, and looking up a position
+costs a handful of integer operations.
+
+    python tablebase.py --pieces 3 --output checkers3.tb
+'''
+import argparse
+import mmap
+import struct
+import sys
+import time
+from array import array
+from itertools import combinations
+from math import comb
+
+from checkers import BitboardCheckersGame, KING_ROW_BITS
+
+
+MAGIC = b"CKTB"
+VERSION = 1
+HEADER = struct.Struct("<4sHH") # Magic, version and maxPieces of a file
+
+UNKNOWN, DRAW = 0, 1 # Stored values, a position decided in d plies is 2 + d
+
+GROUP_SQUARES = (28, 32, 28, 32)
+GROUP_OFFSETS = (4, 0, 0, 0)
+    # Squares white men, white kings, red men and red kings can stand on,
+    # as a count from the lowest. Men never stand on their king row.
+
+BINOMIAL = [[comb(n, k) for k in range(33)] for n in range(33)]
+
+
+def popCount(mask):
+    return bin(mask).count("1")
+
+
+def flipMask(mask):
+    '''
+    def flipMask(mask):
+
+    Returns a bitboard turned round by half a turn: square i becomes
+    square 31 - i.
+    '''
+    return int(f"{mask:032b}"[::-1], 2)
+
+
+def groupRank(mask, offset):
+    '''
+    def groupRank(mask, offset):
+
+    Returns the index of the set of squares in mask among all sets of
+    the same size, counting squares from offset (the combinatorial
+    number system).
+    '''
+    rank, count = 0, 0
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        count += 1
+        rank += BINOMIAL[low.bit_length() - 1 - offset][count]
+    return rank
+
+
+def materials(maxPieces):
+    '''
+    def materials(maxPieces):
+
+    Returns every material balance with up to maxPieces pieces and at
+    least one piece on each side, as (white men, white kings, red men,
+    red kings) tuples, in the order the tables are built in: fewer
+    pieces first, then fewer men.
+    '''
+    found = []
+
+    for total in range(2, maxPieces + 1):
+        for whiteMen in range(total + 1):
+            for whiteKings in range(total - whiteMen + 1):
+                for redMen in range(total - whiteMen - whiteKings + 1):
+                    redKings = total - whiteMen - whiteKings - redMen
+                    if whiteMen + whiteKings and redMen + redKings:
+                        found.append((whiteMen, whiteKings, redMen, redKings))
+
+    found.sort(key=lambda material: (sum(material),
+        material[0] + material[2], material))
+    return found
+
+
+def decode(value):
+    '''
+    def decode(value):
+
+    Returns a stored value as a tuple of the result for the player to
+    move ("win", "loss" or "draw") and the plies left in the game
+    (None for draws), or None for UNKNOWN.
+    '''
+    if value == UNKNOWN:
+        return None
+    if value == DRAW:
+        return ("draw", None)
+
+    plies = value - 2
+    return ("win" if plies % 2 else "loss", plies)
+
+
+class Tablebase(object):
+    '''
+    class Tablebase(maxPieces, values=None)
+
+    Table of results for every position with up to maxPieces pieces.
+    Tables are made with Tablebase.build, saved with save and opened
+    again (memory-mapped) with Tablebase.open. values is the flat
+    table of stored values, a new one filled with UNKNOWN by default.
+
+    slices maps each material balance to the offset of its slice and
+    the number of square sets of each group of pieces.
+    '''
+
+    def __init__(self, maxPieces, values=None):
+        self.maxPieces = maxPieces
+        self.slices = {}
+        self.size = 0
+
+        for material in materials(maxPieces):
+            radices = tuple(BINOMIAL[squares][count]
+                for squares, count in zip(GROUP_SQUARES, material))
+            self.slices[material] = (self.size, radices)
+
+            size = 1
+            for radix in radices:
+                size *= radix
+            self.size += size
+
+        self.values = array("H", [UNKNOWN]) * self.size \
+            if values is None else values
+        self.file = None
+
+    def index(self, white, red, kings):
+        '''
+        Method returns the position of a board (as bitboards, with
+        white to move) in values, or None if it is not in the table.
+        Boards with a man on its own king row (which only a custom
+        board can have) are not in the table.
+        '''
+        if white & ~kings & KING_ROW_BITS[1] or red & ~kings & KING_ROW_BITS[2]:
+            return None
+
+        groups = (white & ~kings, white & kings, red & ~kings, red & kings)
+        entry = self.slices.get(tuple(popCount(mask) for mask in groups))
+        if entry is None:
+            return None
+
+        offset, radices = entry
+        index = 0
+        for mask, radix, start in zip(groups, radices, GROUP_OFFSETS):
+            index = index * radix + groupRank(mask, start)
+
+        return offset + index
+
+    def lookup(self, white, red, kings, whoseMove="white"):
+        '''
+        Method returns the result of a board (as bitboards) for the
+        player to move, as decode does, or None if the board has too
+        many pieces for the table or is not in it (see index). A
+        player with no pieces has lost.
+        '''
+        if popCount(white | red) > self.maxPieces:
+            return None
+
+        if whoseMove != "white":
+            white, red, kings = flipMask(red), flipMask(white), flipMask(kings)
+
+        if not white:
+            return ("loss", 0)
+
+        index = self.index(white, red, kings)
+        return None if index is None else decode(self.values[index])
+
+    def probe(self, game):
+        '''
+        Method returns the result of a CheckersGame's position for the
+        player to move, as lookup does.
+        '''
+        if not isinstance(game, BitboardCheckersGame):
+            game = BitboardCheckersGame(game.board, game.whoseMove)
+        return self.lookup(game.white, game.red, game.kings, game.whoseMove)
+
+    def positions(self, material):
+        '''
+        Generator yielding every board (as a tuple of white, red and
+        kings bitboards) of a material balance.
+        '''
+        groups = [
+            [sum(1 << (square + start) for square in squares)
+                for squares in combinations(range(count), pieces)]
+            for count, start, pieces
+            in zip(GROUP_SQUARES, GROUP_OFFSETS, material)
+        ]
+
+        for whiteMen in groups[0]:
+            for whiteKings in groups[1]:
+                if whiteKings & whiteMen:
+                    continue
+                white = whiteMen | whiteKings
+                for redMen in groups[2]:
+                    if redMen & white:
+                        continue
+                    for redKings in groups[3]:
+                        if redKings & (white | redMen):
+                            continue
+                        yield white, redMen | redKings, whiteKings | redKings
+
+    def solve(self, group):
+        '''
+        Method fills in the values of a material balance and its mirror
+        image (with the colours swapped), given as a list of one or two
+        materials. Every material reached by a capture or promotion
+        must have been solved already.
+
+        Positions with no moves are lost. Working outwards one ply at a
+        time, a position with a move to a lost position is won in one
+        more ply than the quickest such move, and a position whose every
+        move leads to a won position is lost in one more ply than the
+        slowest. Positions left over are draws.
+        '''
+        values = self.values
+        ranges = []
+        for material in group:
+            offset, radices = self.slices[material]
+            size = 1
+            for radix in radices:
+                size *= radix
+            ranges.append(range(offset, offset + size))
+
+        game = BitboardCheckersGame()
+        remaining = {} # Moves of each position not yet known to lose
+        previous = {} # Positions with a quiet move to each position
+        events = [[]] # events[d]: positions with a move to one decided in d
+        lost = []
+
+        for material in group:
+            for white, red, kings in self.positions(material):
+                index = self.index(white, red, kings)
+                game.white, game.red, game.kings = white, red, kings
+                game.whoseMove, game.isWon = "white", False
+
+                moves = game.legalMoves()
+                remaining[index] = len(moves)
+                if not moves:
+                    lost.append(index)
+
+                for move in moves:
+                    undo = game.makeMove("", processed_moves=move,
+                        turn_switching=False)
+
+                    if not game.red:
+                        events[0].append(index)
+                    else:
+                        after = self.index(flipMask(game.red),
+                            flipMask(game.white), flipMask(game.kings))
+
+                        if any(after in span for span in ranges):
+                            previous.setdefault(after, []).append(index)
+                        elif values[after] > DRAW:
+                            plies = values[after] - 2
+                            while len(events) <= plies:
+                                events.append([])
+                            events[plies].append(index)
+
+                    game.unmakeMove(undo)
+
+        def decide(index, plies):
+            values[index] = 2 + plies
+            if index in previous:
+                while len(events) <= plies:
+                    events.append([])
+                events[plies].extend(previous[index])
+
+        for index in lost:
+            decide(index, 0)
+
+        plies = 0
+        while plies < len(events):
+            for index in events[plies]:
+                if values[index] != UNKNOWN:
+                    continue
+                if plies % 2 == 0: # A move to a lost position
+                    decide(index, plies + 1)
+                else:
+                    remaining[index] -= 1
+                    if not remaining[index]:
+                        decide(index, plies + 1)
+            plies += 1
+
+        for index in remaining:
+            if values[index] == UNKNOWN:
+                values[index] = DRAW
+
+    @classmethod
+    def build(cls, maxPieces, progress=None):
+        '''
+        Method builds and returns the tablebase of every position with
+        up to maxPieces pieces. progress, if given, is called with each
+        group of materials (see solve) once it is solved.
+        '''
+        tablebase = cls(maxPieces)
+        solved = set()
+
+        for material in materials(maxPieces):
+            if material in solved:
+                continue
+
+            mirror = material[2:] + material[:2]
+            group = [material] if mirror == material else [material, mirror]
+            tablebase.solve(group)
+            solved.update(group)
+
+            if progress:
+                progress(group)
+
+        return tablebase
+
+    def save(self, fileName):
+        '''
+        Method writes the table to a file: a short header followed by
+        the values as little-endian 16-bit integers.
+        '''
+        values = array("H", self.values)
+        if sys.byteorder != "little":
+            values.byteswap()
+
+        with open(fileName, "wb") as fh:
+            fh.write(HEADER.pack(MAGIC, VERSION, self.maxPieces))
+            values.tofile(fh)
+
+    @classmethod
+    def open(cls, fileName):
+        '''
+        Method opens a table written by save, memory-mapping the file
+        so that only the pages looked at are read. Raises ValueError if
+        the file is not a tablebase.
+        '''
+        with open(fileName, "rb") as fh:
+            data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(data) < HEADER.size:
+            data.close()
+            raise ValueError(f"{fileName} is not a checkers tablebase.")
+
+        magic, version, maxPieces = HEADER.unpack_from(data)
+        view = memoryview(data)[HEADER.size:]
+
+        if magic != MAGIC or version != VERSION or len(view) % 2:
+            view.release()
+            data.close()
+            raise ValueError(f"{fileName} is not a checkers tablebase.")
+
+        if sys.byteorder == "little":
+            values = view.cast("H")
+        else:
+            values = array("H", view)
+            values.byteswap()
+
+        tablebase = cls(maxPieces, values)
+        tablebase.file = (data, view)
+
+        if len(values) != tablebase.size:
+            tablebase.close()
+            raise ValueError(f"{fileName} does not hold a whole tablebase.")
+
+        return tablebase
+
+    def close(self):
+        '''
+        Method closes the file of a table opened with Tablebase.open.
+        '''
+        if self.file is None:
+            return
+
+        data, view = self.file
+        if isinstance(self.values, memoryview):
+            self.values.release()
+        view.release()
+        data.close()
+        self.file = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build a checkers endgame tablebase."
+    )
+    parser.add_argument("-p", "--pieces", type=int, default=3,
+        help="most pieces on the board (default: 3)")
+    parser.add_argument("-o", "--output", required=True,
+        help="file to write the tablebase to")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+
+    def progress(group):
+        names = ", ".join("wm{}wk{}rm{}rk{}".format(*material)
+            for material in group)
+        print(f"{time.perf_counter() - start:8.1f}s  {names}", flush=True)
+
+    tablebase = Tablebase.build(args.pieces, progress)
+    tablebase.save(args.output)
+
+    counts = {"win": 0, "loss": 0, "draw": 0}
+    longest = 0
+    for value in tablebase.values:
+        found = decode(value)
+        if found:
+            counts[found[0]] += 1
+            if found[1] is not None:
+                longest = max(longest, found[1])
+
+    print(
+        f"{tablebase.size} entries: {counts['win']} won, {counts['loss']} "
+        f"lost, {counts['draw']} drawn, longest {longest} plies"
+    )
+
+
+if __name__ == "__main__":
+    main()
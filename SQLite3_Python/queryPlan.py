@@ -0,0 +1,394 @@
+'''
+Query plan instrumentation and index advice for SQLite queries.
+
+A QueryProfiler set as the profiler of a ConnectionPool records every
+query run through the pool: its EXPLAIN QUERY PLAN, the rows it
+returned, the time spent running and fetching it, and the tables it
+read in full. suggestIndexes looks at a query's plan and the columns
+it compares, and suggests indexes for the tables read in full (or,
+optionally, covering indexes for tables read through an index).
+
+Run from the command line to profile the song queries of
+sqlitePractice.py against a database:
+
+    python queryPlan.py chinook.db
+    python queryPlan.py chinook.db --covering --create
+'''
+import argparse
+import re
+import time
+
+
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(?: USING (COVERING )?INDEX (\w+))?")
+SEARCH = re.compile(r"^SEARCH (?:TABLE )?(\w+)(?: AS \w+)?(?: USING (COVERING )?INDEX (\w+))?")
+    # Plan details of a table read in full, or through a key or index
+
+COMPARISON = re.compile(
+    r"(?:(\w+)\.)?(\w+)\s*(=|<=|>=|<>|!=|<|>)\s*(?:(\w+)\.)?(\w+|\?|'[^']*')"
+) # Column compared to another column or a value, as in WHERE and ON
+
+COLUMN = re.compile(r"(?:(\w+)\.)?(\w+)") # Column name, with its table if given
+
+RANGE_OPERATORS = ("<", ">", "<=", ">=")
+
+
+def explain(connection, sql, parameters=()):
+    '''
+    def explain(connection, sql, parameters=()):
+
+    Returns the EXPLAIN QUERY PLAN of a query as a list of its details,
+    indented two spaces for each level below the top.
+    '''
+    rows = connection.execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    depth = {0: -1}
+    details = []
+
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        details.append("  " * depth[node] + detail)
+
+    return details
+
+
+def fullScans(plan):
+    '''
+    def fullScans(plan):
+
+    Returns the tables a query plan (as from explain) reads every row
+    of without an index.
+    '''
+    scans = []
+
+    for detail in plan:
+        match = SCAN.match(detail.strip())
+        if match and not match.group(3):
+            scans.append(match.group(1))
+
+    return scans
+
+
+class QueryRecord(object):
+    '''
+    class QueryRecord(sql, parameters, plan)
+
+    Profile of one run of a query: its plan (see explain), the tables
+    it read in full (scans), the rows fetched and the seconds spent
+    running the query and fetching its rows.
+    '''
+
+    def __init__(self, sql, parameters, plan):
+        self.sql = sql
+        self.parameters = parameters
+        self.plan = plan
+        self.scans = fullScans(plan)
+        self.rows = 0
+        self.seconds = 0.0
+
+    def __str__(self):
+        scans = f"  full scan of {', '.join(self.scans)}" if self.scans else ""
+        return f"{self.seconds * 1000:9.3f}ms {self.rows:>7} rows{scans}  " + \
+            " ".join(self.sql.split())
+
+
+class ProfiledCursor(object):
+    '''
+    class ProfiledCursor(cursor, record, profiler)
+
+    Wraps an sqlite3 cursor, counting the rows fetched from it and the
+    time spent fetching them into a QueryRecord. The record is added
+    to the profiler once every row has been fetched, or the cursor is
+    closed. Other cursor attributes are passed through.
+    '''
+
+    def __init__(self, cursor, record, profiler):
+        self.cursor = cursor
+        self.record = record
+        self.profiler = profiler
+        self.done = False
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        self.record.seconds += time.perf_counter() - start
+        return result
+
+    def finish(self):
+        if not self.done:
+            self.done = True
+            self.profiler.records.append(self.record)
+
+    def fetchone(self):
+        row = self.fetch(self.cursor.fetchone)
+        if row is None:
+            self.finish()
+        else:
+            self.record.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.cursor.arraysize if size is None else size
+        rows = self.fetch(self.cursor.fetchmany, size)
+        self.record.rows += len(rows)
+        if len(rows) < size:
+            self.finish()
+        return rows
+
+    def fetchall(self):
+        rows = self.fetch(self.cursor.fetchall)
+        self.record.rows += len(rows)
+        self.finish()
+        return rows
+
+    def close(self):
+        self.finish()
+        self.cursor.close()
+
+
+class QueryProfiler(object):
+    '''
+    class QueryProfiler()
+
+    Records a QueryRecord for every query it runs (see execute) in
+    records. Plans are looked up once for each distinct SQL string.
+    Set as the profiler of a ConnectionPool to profile every query run
+    through the pool:
+
+        pool = getPool("chinook.db")
+        pool.profiler = QueryProfiler()
+    '''
+
+    def __init__(self):
+        self.records = []
+        self.plans = {}
+
+    def execute(self, connection, sql, parameters=()):
+        '''
+        Method runs a query on a connection and returns a
+        ProfiledCursor for its rows.
+        '''
+        plan = self.plans.get(sql)
+        if plan is None:
+            plan = self.plans[sql] = explain(connection, sql, parameters)
+
+        record = QueryRecord(sql, parameters, plan)
+
+        start = time.perf_counter()
+        cursor = connection.execute(sql, parameters)
+        record.seconds += time.perf_counter() - start
+
+        return ProfiledCursor(cursor, record, self)
+
+    def summary(self):
+        '''
+        Method returns a list of (sql, runs, rows, seconds, scans)
+        tuples totalling the records of each distinct query, slowest
+        first.
+        '''
+        totals = {}
+
+        for record in self.records:
+            runs, rows, seconds, scans = totals.get(record.sql, (0, 0, 0.0, []))
+            totals[record.sql] = (runs + 1, rows + record.rows,
+                seconds + record.seconds, record.scans)
+
+        return sorted(((sql,) + total for sql, total in totals.items()),
+            key=lambda total: -total[3])
+
+    def clear(self):
+        self.records = []
+
+
+def tableColumns(connection, table):
+    '''
+    def tableColumns(connection, table):
+
+    Returns a tuple of the columns of a table and the name of its
+    INTEGER PRIMARY KEY column (which is the rowid), or None.
+    '''
+    info = connection.execute(f"PRAGMA table_info('{table}')").fetchall()
+    keys = [row for row in info if row[5]]
+    rowid = keys[0][1] if len(keys) == 1 and \
+        keys[0][2].upper() == "INTEGER" else None
+    return [row[1] for row in info], rowid
+
+
+def tableIndexes(connection, table):
+    '''
+    def tableIndexes(connection, table):
+
+    Returns a dictionary of the indexes of a table, mapping their names
+    to lists of their columns.
+    '''
+    return {
+        row[1]: [column[2] for column
+            in connection.execute(f"PRAGMA index_info('{row[1]}')")]
+        for row in connection.execute(f"PRAGMA index_list('{table}')")
+    }
+
+
+def suggestIndexes(connection, sql, parameters=(), covering=False):
+    '''
+    def suggestIndexes(connection, sql, parameters=(), covering=False):
+
+    Returns a list of CREATE INDEX statements that could speed up a
+    query. A table the plan reads in full is given an index on the
+    columns the query compares with =, followed by those compared by
+    range, unless it already has an index starting with them (then
+    SQLite chose to read it in full, as the outer loop of a join). A
+    table with columns compared to a value with = (rather than to
+    another table's column) is given an index starting with those
+    columns if it has none, whatever the plan, as it is the place a
+    join could start from.
+    With covering, those indexes also hold every other column of the
+    table the query uses, and tables read through an index that does
+    not cover the query are given one that does.
+
+    Columns are found by name: unqualified names are matched to the
+    one table of the query that has them. Table aliases are not
+    followed.
+    '''
+    plan = explain(connection, sql, parameters)
+    accesses = {}
+
+    for detail in plan:
+        detail = detail.strip()
+        for pattern, kind in ((SCAN, "scan"), (SEARCH, "search")):
+            match = pattern.match(detail)
+            if match:
+                accesses[match.group(1)] = (kind, bool(match.group(2)), match.group(3))
+
+    columns, rowids = {}, {}
+    for table in accesses:
+        columns[table], rowids[table] = tableColumns(connection, table)
+
+    def resolve(qualifier, name):
+        if qualifier:
+            return (qualifier, name) if name in columns.get(qualifier, ()) else None
+        owners = [table for table in columns if name in columns[table]]
+        return (owners[0], name) if len(owners) == 1 else None
+
+    equal, ranged, filtered = {}, {}, {}
+    for match in COMPARISON.finditer(sql):
+        operator = match.group(3)
+        sides = (match.group(1, 2), match.group(4, 5))
+        for side, (qualifier, name) in enumerate(sides):
+            column = resolve(qualifier, name)
+            if not column or column[1] == rowids[column[0]]:
+                continue
+
+            found = [ranged if operator in RANGE_OPERATORS else equal]
+            if operator == "=" and not resolve(*sides[1 - side]):
+                found.append(filtered) # Compared to a value, not a column
+            for columnsOf in found:
+                columnsOf.setdefault(column[0], [])
+                if column[1] not in columnsOf[column[0]]:
+                    columnsOf[column[0]].append(column[1])
+
+    used = {}
+    for qualifier, name in COLUMN.findall(sql):
+        column = resolve(qualifier, name)
+        if column and column[1] != rowids[column[0]]:
+            used.setdefault(column[0], [])
+            if column[1] not in used[column[0]]:
+                used[column[0]].append(column[1])
+
+    suggestions = []
+
+    for table, (kind, coveringIndex, index) in accesses.items():
+        keys = equal.get(table, []) + \
+            [name for name in ranged.get(table, []) if name not in equal.get(table, [])]
+        indexes = tableIndexes(connection, table)
+        leading = {tuple(existing[:1]) for existing in indexes.values()}
+
+        values = filtered.get(table, [])
+
+        if values and (values[0],) not in leading:
+            keys = values + [name for name in keys if name not in values]
+        elif kind == "scan" and not index:
+            if not keys or tuple(keys[:1]) in leading:
+                continue
+        elif covering and index and not coveringIndex:
+            keys = indexes[index] + [name for name in keys
+                if name not in indexes[index]]
+        else:
+            continue
+
+        if covering:
+            keys += [name for name in used.get(table, []) if name not in keys]
+
+        name = f"idx_{table}_" + "_".join(keys)
+        suggestions.append(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(keys)})"
+        )
+
+    return suggestions
+
+
+def createIndexes(connection, statements):
+    '''
+    def createIndexes(connection, statements):
+
+    Runs CREATE INDEX statements (such as suggestIndexes returns), then
+    ANALYZE so that the query planner knows about them.
+    '''
+    with connection:
+        for statement in statements:
+            connection.execute(statement)
+    connection.execute("ANALYZE")
+
+
+def main(argv=None):
+    from connectionPool import getPool
+    from sqlitePractice import getSongDict, iterSongs, getSongPage
+
+    parser = argparse.ArgumentParser(
+        description="Profile the song queries and suggest indexes."
+    )
+    parser.add_argument("database", help="path to chinook.db")
+    parser.add_argument("--covering", action="store_true",
+        help="suggest covering indexes")
+    parser.add_argument("--create", action="store_true",
+        help="create the suggested indexes")
+    args = parser.parse_args(argv)
+
+    pool = getPool(args.database)
+    pool.profiler = QueryProfiler()
+
+    getSongDict(args.database)
+    for _ in iterSongs(args.database, genre="Rock"):
+        pass
+    getSongPage(args.database, afterTrackId=1000, artist="AC/DC")
+
+    suggestions = []
+
+    for record in pool.profiler.records:
+        print(record)
+        for detail in record.plan:
+            print("    " + detail)
+
+        for statement in suggestIndexes(pool.connection(), record.sql,
+                record.parameters, args.covering):
+            if statement not in suggestions:
+                suggestions.append(statement)
+
+    print("Suggested indexes:" if suggestions else "No indexes to suggest")
+    for statement in suggestions:
+        print("    " + statement)
+
+    if args.create and suggestions:
+        createIndexes(pool.connection(), suggestions)
+        print(f"Created {len(suggestions)} indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+'''
+Cached query results that know when their database has changed.
+
+A ResultCache keeps the results of functions of a database file, such
+as sqlitePractice.getSongDict, keyed by the file's path, the function
+and its arguments. A result is used again for as long as the database
+is unchanged, which is checked on every call from:
+- the size and modification time of the database file and of its
+    write-ahead log, if it has one, which any write (from this process
+    or another) changes;
+- PRAGMA data_version, read on a connection of the cache's own, which
+    changes whenever another connection commits to the database, even
+    if the file times are too coarse to tell.
+
+Results are kept in memory, the least recently used going first once
+there are maxEntries of them. With a snapshotDirectory they are also
+pickled to disk, so another process (or this one, started again) can
+use them as long as the file sizes and times still match.
+
+    cache = ResultCache(snapshotDirectory="snapshots")
+    songs = cache.call(getSongDict, "chinook.db")
+'''
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+MAX_ENTRIES = 32 # Results kept in memory by default
+
+
+def fileVersion(database):
+    '''
+    def fileVersion(database):
+
+    Returns a tuple of the sizes and modification times (in
+    nanoseconds) of a database file and its write-ahead log, or None if
+    the database file does not exist.
+    '''
+    version = []
+
+    for path in (database, database + "-wal"):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if path == database:
+                return None
+            version.append(None)
+        else:
+            version.append((stat.st_size, stat.st_mtime_ns))
+
+    return tuple(version)
+
+
+class ResultCache(object):
+    '''
+    class ResultCache(maxEntries=MAX_ENTRIES, snapshotDirectory=None)
+
+    Cache of results of functions of a database (see call). Optional
+    parameters:
+    - maxEntries: Most results kept in memory.
+    - snapshotDirectory: Directory to pickle results to, made if it
+        does not exist. Default is to keep results in memory only.
+
+    Results are shared between every caller that gets them from the
+    cache, so they must not be changed; copy one first to change it.
+    hits and misses count the calls answered from memory (or a
+    snapshot) and the calls that ran their function.
+    '''
+
+    def __init__(self, maxEntries=MAX_ENTRIES, snapshotDirectory=None):
+        self.maxEntries = maxEntries
+        self.snapshotDirectory = snapshotDirectory
+        self.entries = OrderedDict() # Key to (version, result), oldest first
+        self.connections = {} # Connections reading data_version, by path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if snapshotDirectory:
+            os.makedirs(snapshotDirectory, exist_ok=True)
+
+    def version(self, database):
+        '''
+        Method returns the current version of a database file as a
+        tuple of its fileVersion and data_version, or None if the file
+        does not exist.
+        '''
+        files = fileVersion(database)
+        if files is None:
+            return None
+
+        with self.lock:
+            connection = self.connections.get(database)
+            if connection is None:
+                # Read-only, so that a missing file is never made empty
+                connection = self.connections[database] = sqlite3.connect(
+                    Path(database).as_uri() + "?mode=ro", uri=True,
+                    check_same_thread=False)
+            dataVersion = connection.execute("PRAGMA data_version").fetchone()[0]
+
+        return files, dataVersion
+
+    def snapshotPath(self, key):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.snapshotDirectory, name + ".pickle")
+
+    def readSnapshot(self, key, files):
+        '''
+        Method returns the result pickled for a key, or None if there
+        is none, it was taken of another version of the files, or it
+        cannot be loaded (for example, its classes have changed since).
+        '''
+        try:
+            with open(self.snapshotPath(key), "rb") as fh:
+                snapshotKey, snapshotFiles, result = pickle.load(fh)
+        except Exception:
+            return None
+
+        if snapshotKey != key or snapshotFiles != files:
+            return None
+        return result
+
+    def writeSnapshot(self, key, files, result):
+        '''
+        Method pickles a result for a key, writing to a temporary file
+        first so that readers never see half of one.
+        '''
+        path = self.snapshotPath(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}"
+
+        with open(temporary, "wb") as fh:
+            pickle.dump((key, files, result), fh, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+    def call(self, function, database, *arguments):
+        '''
+        Method returns function(database, *arguments), running it only
+        if there is no result for the same database path, function and
+        arguments from the database's current version. Arguments must
+        be hashable.
+        '''
+        database = os.path.abspath(database)
+        version = self.version(database)
+        if version is None: # Let the function report the missing file
+            return function(database, *arguments)
+
+        key = (database, function.__module__, function.__qualname__, arguments)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        result = None
+        if self.snapshotDirectory:
+            result = self.readSnapshot(key, version[0])
+
+        if result is None:
+            # The version is read before running, so a write made while
+            # the function runs is seen by the next call
+            result = function(database, *arguments)
+            if self.snapshotDirectory:
+                self.writeSnapshot(key, version[0], result)
+            with self.lock:
+                self.misses += 1
+        else:
+            with self.lock:
+                self.hits += 1
+
+        with self.lock:
+            self.entries[key] = (version, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+
+        return result
+
+    def clear(self):
+        '''
+        Method forgets every result kept in memory, and deletes the
+        snapshots in snapshotDirectory.
+        '''
+        with self.lock:
+            self.entries.clear()
+
+        if self.snapshotDirectory:
+            for name in os.listdir(self.snapshotDirectory):
+                if name.endswith(".pickle"):
+                    os.remove(os.path.join(self.snapshotDirectory, name))
+
+    def close(self):
+        '''
+        Method closes the connections used to read data_version. They
+        are opened again if the cache is used after.
+        '''
+        with self.lock:
+            connections, self.connections = self.connections, {}
+
+        for connection in connections.values():
+            connection.close()
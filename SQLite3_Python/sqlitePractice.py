@@ -1,22 +1,23 @@
 # SQL NOTES
 import sqlite3
 
-connection = sqlite3.connect("aquarium.db")
+if __name__ == "__main__": # Only run the notes when this file is run itself
+    connection = sqlite3.connect("aquarium.db")
 
-# Cursor is an object which allows us to send and manipulate SQL commands as strings.
-cursor = connection.cursor()
-cursor.execute("DROP TABLE IF EXISTS fish")
-cursor.execute("CREATE TABLE IF NOT EXISTS fish (id INTEGER PRIMARY KEY, name TEXT, species TEXT, tank_number INTEGER)")
+    # Cursor is an object which allows us to send and manipulate SQL commands as strings.
+    cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS fish")
+    cursor.execute("CREATE TABLE IF NOT EXISTS fish (id INTEGER PRIMARY KEY, name TEXT, species TEXT, tank_number INTEGER)")
 
-for each in [('Sammy', 'shark', 1), ('Jamie', 'cuttlefish', 7), ('Jax', 'Octopus', 7)]:
-    cursor.execute("INSERT INTO fish (name, species, tank_number) VALUES (?, ?, ?)", each)
-                                            # Cannot use ? and (tuple,) instead of (?, ?, ?)
+    for each in [('Sammy', 'shark', 1), ('Jamie', 'cuttlefish', 7), ('Jax', 'Octopus', 7)]:
+        cursor.execute("INSERT INTO fish (name, species, tank_number) VALUES (?, ?, ?)", each)
+                                                # Cannot use ? and (tuple,) instead of (?, ?, ?)
 
-cursor.execute("DELETE FROM fish WHERE name = ?", ("Sammy",)) #Ensure that values are always passed in as a tuple!
-cursor.execute("UPDATE fish SET tank_number = ? WHERE name = ?" (3, "Jax"))
-cursor.execute("UPDATE fish SET species = 'Micheal Jackson' WHERE name LIKE 'J%'")
-connection.commit() # Update database with changes
-rows = cursor.execute("SELECT * FROM fish").fetchall() # Select all from fish
+    cursor.execute("DELETE FROM fish WHERE name = ?", ("Sammy",)) #Ensure that values are always passed in as a tuple!
+    cursor.execute("UPDATE fish SET tank_number = ? WHERE name = ?", (3, "Jax"))
+    cursor.execute("UPDATE fish SET species = 'Micheal Jackson' WHERE name LIKE 'J%'")
+    connection.commit() # Update database with changes
+    rows = cursor.execute("SELECT * FROM fish").fetchall() # Select all from fish
 
 
 # SQL Practice Question
@@ -50,29 +51,120 @@ The key for each entry should be its trackid (as a string). Value is a dictionar
     }
 }
 '''
-import sqlite3
+from connectionPool import getPool
+from resultCache import ResultCache
 
-def getSongDict(database):
-    
-    connection = sqlite3.connect(database)
-    cursor = connection.cursor()
-
-    trackParse = cursor.execute(
-        "SELECT TrackId, tracks.Name, genres.Name, tracks.GenreId, Composer, albums.Title, artists.Name \
+SONG_QUERY = "SELECT TrackId, tracks.Name, genres.Name, tracks.GenreId, Composer, albums.Title, artists.Name \
         FROM tracks, genres, albums, artists \
         WHERE tracks.GenreId = genres.GenreId \
         AND tracks.AlbumId = albums.AlbumId \
         AND albums.ArtistId = artists.ArtistId"
-        ).fetchall()
 
-    connection.close()
+def songEntry(row):
+    '''
+    def songEntry(row):
+
+    Returns the (trackid, song dictionary) item of getSongDict for a
+    row of SONG_QUERY.
+    '''
+    return str(row[0]), {
+        'trackname': row[1],
+        'genre': row[2],
+        'genreid': row[3],
+        'composer': row[4],
+        'album': {'albumtitle': row[5], 'artistname': row[6]},
+    }
+
+def getSongDict(database):
+    
+    # Connections (and the prepared query) are kept open between calls
+    trackParse = getPool(database).execute(SONG_QUERY).fetchall()
+
+    return dict(map(songEntry, trackParse))
+
+SONG_CACHE = ResultCache() # Results of getCachedSongDict
+
+def getCachedSongDict(database, cache=SONG_CACHE):
+    '''
+    def getCachedSongDict(database, cache=SONG_CACHE):
+
+    Returns getSongDict(database), only running the query again once
+    the database has changed since the last call (see ResultCache).
+    The dictionary is shared between calls, so it must not be changed.
+    Pass a ResultCache with a snapshotDirectory to keep the dictionary
+    on disk between runs.
+    '''
+    return cache.call(getSongDict, database)
+
+def songQuery(genre=None, artist=None, afterTrackId=None, limit=None):
+    '''
+    def songQuery(genre=None, artist=None, afterTrackId=None, limit=None):
+
+    Returns SONG_QUERY in TrackId order, narrowed down by the given
+    filters, as a tuple of the SQL and its parameters.
+    - genre, artist: Name (as a string) or id (as an int) to keep.
+    - afterTrackId: Only keep tracks with a higher TrackId.
+    - limit: Most rows to return.
+    '''
+    sql, parameters = [SONG_QUERY], []
+
+    for value, idColumn, nameColumn in (
+            (genre, "tracks.GenreId", "genres.Name"),
+            (artist, "albums.ArtistId", "artists.Name")):
+        if value is not None:
+            column = idColumn if isinstance(value, int) else nameColumn
+            sql.append(f"AND {column} = ?")
+            parameters.append(value)
+
+    if afterTrackId is not None:
+        sql.append("AND TrackId > ?")
+        parameters.append(afterTrackId)
+
+    sql.append("ORDER BY TrackId")
+
+    if limit is not None:
+        sql.append("LIMIT ?")
+        parameters.append(limit)
+
+    return " ".join(sql), tuple(parameters)
+
+def iterSongs(database, genre=None, artist=None, afterTrackId=None, batchSize=500):
+    '''
+    def iterSongs(database, genre=None, artist=None, afterTrackId=None, batchSize=500):
+
+    Generator yielding the (trackid, song dictionary) items of
+    getSongDict in TrackId order, filtered as songQuery does. Rows are
+    fetched batchSize at a time, so only one batch is held in memory
+    and the first songs arrive before the rest have been read. To carry
+    on later from where a loop stopped, pass the last trackid seen as
+    afterTrackId.
+    '''
+    cursor = getPool(database).execute(*songQuery(genre, artist, afterTrackId))
+
+    try:
+        while True:
+            rows = cursor.fetchmany(batchSize)
+            if not rows:
+                return
+            yield from map(songEntry, rows)
+    finally:
+        cursor.close()
+
+def getSongPage(database, afterTrackId=None, limit=100, genre=None, artist=None):
+    '''
+    def getSongPage(database, afterTrackId=None, limit=100, genre=None, artist=None):
+
+    Returns up to limit songs after afterTrackId (filtered as songQuery
+    does) as a dictionary in the form of getSongDict, and the TrackId
+    to pass as afterTrackId for the next page (None after the last
+    page). Pages are found by TrackId rather than by offset, so each
+    page costs the same however far into the catalog it is.
+    '''
+    rows = getPool(database).execute(
+        *songQuery(genre, artist, afterTrackId, limit)).fetchall()
 
-    return { str(each[0]): {
-             'trackname': each[1],
-             'genre': each[2],
-             'genreid': each[3],
-             'composer': each[4],
-             'album': {'albumtitle': each[5], 'artistname': each[6]},
-            } for each in trackParse }
+    nextTrackId = rows[-1][0] if len(rows) == limit else None
+    return dict(map(songEntry, rows)), nextTrackId
 
-print(getSongDict("chinook.db"))
\ No newline at end of file
+if __name__ == "__main__":
+    print(getSongDict("chinook.db"))
@@ -0,0 +1,181 @@
+'''
+Batch solving of whole Sudoku puzzle files.
+
+Puzzles are streamed from a file, solved across a pool of worker
+processes and written out one JSON line per puzzle as the results come
+in. Can be run from the command line:
+
+    python batch.py A10_puzzles.json --workers 4 --output solved.jsonl
+'''
+import argparse
+import json
+import sys
+import time
+from multiprocessing import Pool
+
+from soduko import SudokuPuzzle, UnsolvablePuzzle, elimination_strategy, \
+    board_from_string, board_to_string
+
+
+def read_puzzles(file_name):
+    '''
+    Generator yielding (name, puzzle string) pairs from a puzzle file.
+    Two formats are understood:
+    - JSON: an object mapping names to boards (as in
+        A10_puzzles.json), or a list of boards named by their index.
+    - Text: one puzzle per line as a string of cells (81 characters
+        for 9x9, 256 for 16x16 or 625 for 25x25), optionally
+        preceded by a name and whitespace. Blank lines and lines
+        starting with # are skipped; unnamed puzzles are named by
+        their line number.
+
+    Text files are read one line at a time, so their size is not
+    limited by memory. JSON files have to be parsed as a whole. A JSON
+    board that cannot be written as a string is yielded as it is, for
+    solve_job to report.
+    '''
+    with open(file_name, "r") as fh:
+        first = fh.read(1)
+        while first.isspace():
+            first = fh.read(1)
+        fh.seek(0)
+
+        if first in ("{", "["):
+            data = json.load(fh)
+            items = data.items() if isinstance(data, dict) else enumerate(data)
+            for name, board in items:
+                try:
+                    yield str(name), board_to_string(board)
+                except (TypeError, IndexError):
+                    yield str(name), board
+            return
+
+        for line_number, line in enumerate(fh, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            name = fields[0] if len(fields) > 1 else str(line_number)
+            yield name, fields[-1]
+
+
+def solve_job(job):
+    '''
+    Solves a single (name, puzzle string, engine, incremental) job and
+    returns a result dictionary:
+    {
+        'name': string,
+        'solved': bool,
+        'solution': string (as board_to_string, None if unsolvable),
+        'seconds': float
+    }
+    A puzzle that is not a valid board (of the wrong length, or with a
+    bad character) is not solved, and its result adds an 'error'
+    message instead of stopping the batch. Runs inside the worker
+    processes of solve_all.
+    '''
+    name, text, engine, incremental = job
+
+    start = time.perf_counter()
+    solution = error = None
+
+    try:
+        if not isinstance(text, str):
+            text = board_to_string(text)
+        puzzle = SudokuPuzzle(board_from_string(text))
+        puzzle.solve([elimination_strategy], engine=engine,
+            incremental=incremental)
+        solution = board_to_string(puzzle.board)
+    except UnsolvablePuzzle:
+        pass
+    except (ValueError, TypeError, IndexError) as exception:
+        error = f"{type(exception).__name__}: {exception}"
+
+    result = {
+        'name': name,
+        'solved': solution is not None,
+        'solution': solution,
+        'seconds': time.perf_counter() - start,
+    }
+    if error is not None:
+        result['error'] = error
+
+    return result
+
+
+def solve_all(puzzles, workers=None, engine="mrv", incremental=True,
+        chunksize=64):
+    '''
+    Generator that solves an iterable of (name, puzzle string) pairs
+    (such as read_puzzles returns) and yields the result dictionary
+    of each puzzle (see solve_job) as soon as it is solved. Results
+    are yielded in completion order, not input order.
+    - workers: Number of worker processes.
+        Default is one per CPU. With 1, puzzles are solved in this
+        process.
+    - engine, incremental: Passed on to SudokuPuzzle.solve.
+    - chunksize: Number of puzzles sent to a worker at a time.
+    '''
+    jobs = ((name, text, engine, incremental) for name, text in puzzles)
+
+    if workers == 1:
+        for job in jobs:
+            yield solve_job(job)
+        return
+
+    with Pool(workers) as pool:
+        for result in pool.imap_unordered(solve_job, jobs, chunksize):
+            yield result
+
+
+def write_results(results, fh):
+    '''
+    Writes each result dictionary to an open file as a line of JSON,
+    flushing as it goes. Returns the number of puzzles written, how
+    many of them were solved and how many were not valid puzzles.
+    '''
+    total = solved = invalid = 0
+
+    for result in results:
+        fh.write(json.dumps(result) + "\n")
+        fh.flush()
+        total += 1
+        solved += result['solved']
+        invalid += 'error' in result
+
+    return total, solved, invalid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Solve every Sudoku puzzle in a file."
+    )
+    parser.add_argument("file", help="JSON or one-puzzle-per-line text file")
+    parser.add_argument("-o", "--output", default="-",
+        help="file to write JSON lines results to (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+        help="number of worker processes (default: one per CPU)")
+    parser.add_argument("-e", "--engine", default="mrv",
+        help="solver engine passed to SudokuPuzzle.solve (default: mrv)")
+    parser.add_argument("--chunksize", type=int, default=64,
+        help="puzzles sent to a worker at a time (default: 64)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = solve_all(read_puzzles(args.file), args.workers, args.engine,
+        chunksize=args.chunksize)
+
+    if args.output == "-":
+        total, solved, invalid = write_results(results, sys.stdout)
+    else:
+        with open(args.output, "w") as fh:
+            total, solved, invalid = write_results(results, fh)
+
+    print(
+        f"Solved {solved} of {total} puzzles "
+        f"({invalid} invalid) in {time.perf_counter() - start:.3f}s",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+'''
+Benchmark of SudokuPuzzle.solve.
+
+Solves sets of puzzles with each of the solver engines and reports the
+wall time, the number of guesses made by the brute force fallback, the
+cells filled by each strategy and the peak memory used. Results can be
+saved as JSON and compared against an earlier run to catch regressions.
+
+    python benchmark.py --engines classic,mrv --sets a10 --save run.json
+    python benchmark.py --baseline run.json
+'''
+import argparse
+import json
+import os
+import random
+import tracemalloc
+
+from soduko import SudokuPuzzle, UnsolvablePuzzle, SolveStats, \
+    elimination_strategy, board_from_string
+from generator import generate
+
+
+HARD_PUZZLES = {
+    'ai_escargot': "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    'inkala_2012': "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    'easter_monster': "1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1",
+    'anti_brute_force': "..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9",
+} # Well known puzzles that are hard for people or for naive search
+
+
+def a10_puzzles():
+    '''
+    Returns the puzzles of A10_puzzles.json as a dictionary of boards.
+    '''
+    file_name = os.path.join(os.path.dirname(__file__), "A10_puzzles.json")
+    with open(file_name, "r") as fh:
+        return json.load(fh)
+
+
+def hard_puzzles():
+    '''
+    Returns the puzzles of HARD_PUZZLES as a dictionary of boards.
+    '''
+    return {name: board_from_string(text) for name, text in HARD_PUZZLES.items()}
+
+
+def random_puzzles(count=20, clues=24, seed=0, box_size=3):
+    '''
+    Returns a dictionary of count puzzles made by shuffling a solved
+    grid (relabeling digits and reordering bands, stacks, rows and
+    columns) and keeping clues of its cells at random. The puzzles
+    are solvable but may have more than one solution. Grids are 9x9
+    unless another box_size is given.
+    '''
+    rng = random.Random(seed)
+    size = box_size * box_size
+    lines = range(box_size)
+
+    base = SudokuPuzzle(box_size=box_size)
+    base.solve([], engine="mrv")
+
+    puzzles = {}
+
+    for number in range(count):
+        digits = [0] + rng.sample(range(1, size + 1), size)
+        rows = [band * box_size + row
+            for band in rng.sample(lines, box_size)
+            for row in rng.sample(lines, box_size)]
+        cols = [stack * box_size + col
+            for stack in rng.sample(lines, box_size)
+            for col in rng.sample(lines, box_size)]
+        kept = set(rng.sample(range(size * size), clues))
+
+        puzzles[f"random_{number}"] = [
+            [digits[base.board[r][c]] if i * size + j in kept else 0
+                for j, c in enumerate(cols)]
+            for i, r in enumerate(rows)
+        ]
+
+    return puzzles
+
+
+def large_puzzles(count=3, seed=0):
+    '''
+    Returns a dictionary of count random 16x16 and count random 25x25
+    puzzles (see random_puzzles) for stress-testing the solver. Clues
+    are kept at levels the solver handles in well under a second:
+    random puzzles with around 40% of a 25x25 grid given are the
+    hardest to complete, and can take minutes.
+    '''
+    puzzles = {}
+
+    for box_size, clues in ((4, 104), (5, 344)):
+        size = box_size * box_size
+        for name, board in random_puzzles(count, clues, seed, box_size).items():
+            puzzles[f"{size}x{size}_{name}"] = board
+
+    return puzzles
+
+
+def generated_puzzles(count=10, difficulty="expert", seed=0):
+    '''
+    Returns a dictionary of count puzzles with exactly one solution,
+    made by the puzzle generator at the given difficulty.
+    '''
+    rng = random.Random(seed)
+    return {f"{difficulty}_{number}": generate(rng, difficulty)[0]
+        for number in range(count)}
+
+
+PUZZLE_SETS = {
+    'a10': a10_puzzles,
+    'hard': hard_puzzles,
+    'random': random_puzzles,
+    'generated': generated_puzzles,
+    'large': large_puzzles,
+}
+
+
+def run_one(board, engine, incremental=False, repeat=3):
+    '''
+    Solves a board repeat times with an engine and returns a result
+    dictionary built from the SolveStats of the fastest run, with the
+    peak memory taken from one extra run under tracemalloc (tracing
+    slows the solver down, so it is kept out of the timed runs).
+    '''
+    def solve_once():
+        stats = SolveStats()
+        try:
+            SudokuPuzzle(board).solve([elimination_strategy], engine=engine,
+                incremental=incremental, stats=stats)
+            return stats, True
+        except UnsolvablePuzzle:
+            return stats, False
+
+    best, solved = min(
+        (solve_once() for _ in range(repeat)),
+        key=lambda run: run[0].seconds
+    )
+
+    tracemalloc.start()
+    try:
+        traced, _ = solve_once()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'engine': engine,
+        'incremental': incremental,
+        'solved': solved,
+        'seconds': best.seconds,
+        'branches': best.branches,
+        'fills': best.fills,
+        'peak_memory': traced.peak_memory,
+    }
+
+
+def run_benchmark(sets, engines, incremental=(False,), repeat=3):
+    '''
+    Generator that runs every puzzle of the named puzzle sets (keys of
+    PUZZLE_SETS) with every engine and incremental setting, yielding a
+    result dictionary (see run_one) with 'set' and 'puzzle' keys added.
+    '''
+    for set_name in sets:
+        for name, board in PUZZLE_SETS[set_name]().items():
+            for engine in engines:
+                for flag in incremental:
+                    result = run_one(board, engine, flag, repeat)
+                    result['set'], result['puzzle'] = set_name, name
+                    yield result
+
+
+def result_key(result):
+    return (result['set'], result['puzzle'], result['engine'],
+        result['incremental'])
+
+
+def find_regressions(results, baseline, tolerance=0.25):
+    '''
+    Compares results against baseline results (from an earlier run) and
+    returns a list of messages for every puzzle that became more than
+    tolerance (as a fraction) slower, or needed more guesses.
+    '''
+    before = {result_key(result): result for result in baseline}
+    messages = []
+
+    for result in results:
+        old = before.get(result_key(result))
+        if old is None:
+            continue
+
+        label = "/".join(str(part) for part in result_key(result))
+
+        if result['seconds'] > old['seconds'] * (1 + tolerance):
+            messages.append(
+                f"{label}: {old['seconds']:.4f}s -> {result['seconds']:.4f}s"
+            )
+        if result['branches'] > old['branches']:
+            messages.append(
+                f"{label}: {old['branches']} -> {result['branches']} branches"
+            )
+
+    return messages
+
+
+def format_result(result):
+    fills = ", ".join(f"{name}={count}" for name, count
+        in sorted(result['fills'].items()))
+    memory = "-" if result['peak_memory'] is None \
+        else f"{result['peak_memory'] / 1024:.1f}KiB"
+
+    return (
+        f"{result['set']:<10}{result['puzzle']:<22}{result['engine']:<8}"
+        f"{'inc' if result['incremental'] else '':<4}"
+        f"{result['seconds'] * 1000:>10.3f}ms{result['branches']:>8}"
+        f"{memory:>11}  {fills}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku solver.")
+    parser.add_argument("--sets", default="a10,hard,random,generated,large",
+        help="comma separated puzzle sets: " + ", ".join(PUZZLE_SETS))
+    parser.add_argument("--engines", default="mrv",
+        help="comma separated solver engines (classic, trail, bitmask, mrv, dlx)")
+    parser.add_argument("--incremental", choices=("off", "on", "both"),
+        default="off", help="apply strategies through the work queue")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="timed runs per puzzle, the fastest is kept")
+    parser.add_argument("--save", help="write the results to a JSON file")
+    parser.add_argument("--baseline",
+        help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+        help="allowed slowdown against the baseline (default 0.25)")
+    args = parser.parse_args(argv)
+
+    incremental = {"off": (False,), "on": (True,), "both": (False, True)}
+    results = []
+
+    print(f"{'set':<10}{'puzzle':<22}{'engine':<12}{'time':>12}"
+        f"{'guesses':>8}{'memory':>11}  fills")
+
+    for result in run_benchmark(args.sets.split(","), args.engines.split(","),
+            incremental[args.incremental], args.repeat):
+        print(format_result(result), flush=True)
+        results.append(result)
+
+    total = sum(result['seconds'] for result in results)
+    print(f"Total solve time: {total * 1000:.3f}ms over {len(results)} runs")
+
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(results, fh, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, "r") as fh:
+            messages = find_regressions(results, json.load(fh), args.tolerance)
+
+        for message in messages:
+            print("REGRESSION", message)
+
+        if messages:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+'''
+Cache of Sudoku solutions shared between puzzles that are the same up
+to a symmetry.
+
+Sudoku puzzles stay valid (and keep the same number of solutions) when
+the digits are relabeled, the grid is transposed, the three bands (or
+stacks) are reordered, or the rows in a band (or columns in a stack)
+are reordered. Puzzles are put into a canonical form under these
+symmetries before being looked up, so a solution found for one puzzle
+answers every puzzle equivalent to it.
+'''
+import json
+import os
+from collections import Counter, OrderedDict
+from itertools import permutations, product
+from math import factorial, prod
+
+from soduko import board_from_string, board_to_string
+
+
+def tie_orders(items, key):
+    '''
+    Returns every ordering of items that is sorted by key, with items
+    that have equal keys taken in every possible order.
+    '''
+    items = sorted(items, key=key)
+    groups = []
+
+    for item in items:
+        if groups and key(groups[-1][0]) == key(item):
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+
+    return [
+        [item for group in choice for item in group]
+        for choice in product(*(list(permutations(group)) for group in groups))
+    ]
+
+
+def line_orders(keys):
+    '''
+    Returns every order of the 9 rows (or columns) of a grid that sorts
+    the bands by their lines' keys and the lines inside each band by
+    their own key, given the key of each line.
+    '''
+    inside = [tie_orders(range(band * 3, band * 3 + 3), lambda i: keys[i])
+        for band in range(3)]
+    band_key = lambda band: sorted(keys[band * 3:band * 3 + 3])
+
+    return [
+        [line for lines in choice for line in lines]
+        for bands in tie_orders(range(3), band_key)
+        for choice in product(*(inside[band] for band in bands))
+    ]
+
+
+def tie_count(keys):
+    '''
+    Returns the number of orderings tie_orders gives for items with
+    the given keys.
+    '''
+    return prod(factorial(count) for count in Counter(keys).values())
+
+
+def order_count(keys):
+    '''
+    Returns the number of orders line_orders gives for the given line
+    keys, without listing them.
+    '''
+    bands = [keys[band * 3:band * 3 + 3] for band in range(3)]
+    return tie_count(tuple(sorted(lines)) for lines in bands) * \
+        prod(tie_count(lines) for lines in bands)
+
+
+def line_keys(grid, rounds=3):
+    '''
+    Returns keys for the rows and columns of a grid that do not change
+    when the grid's symmetries are applied. Rows, columns and digits
+    start out equal and are then repeatedly told apart by the keys of
+    the lines and digits their clues meet, so lines only share a key
+    when the clues give no way to tell them apart.
+    '''
+    clues = [(r, c, grid[r][c])
+        for r in range(9) for c in range(9) if grid[r][c]]
+    rows, cols, digits = [0] * 9, [0] * 9, [0] * 10
+
+    def rank(signatures):
+        order = sorted(set(signatures))
+        return [order.index(signature) for signature in signatures]
+
+    for _ in range(rounds):
+        row_sigs = [[rows[r]] for r in range(9)]
+        col_sigs = [[cols[c]] for c in range(9)]
+        digit_sigs = [[digits[d]] for d in range(10)]
+
+        for r, c, d in clues:
+            row_sigs[r].append((cols[c], digits[d]))
+            col_sigs[c].append((rows[r], digits[d]))
+            digit_sigs[d].append((rows[r], cols[c]))
+
+        rows = rank([(sig[0], tuple(sorted(sig[1:]))) for sig in row_sigs])
+        cols = rank([(sig[0], tuple(sorted(sig[1:]))) for sig in col_sigs])
+        digits = rank([(sig[0], tuple(sorted(sig[1:]))) for sig in digit_sigs])
+
+    return rows, cols
+
+
+def canonical_form(board, limit=256):
+    '''
+    Returns the canonical 81 character string of a 9x9 board along with
+    the transform that produced it, as a tuple:
+    (transposed, row order, column order, digit relabeling)
+
+    Lines are sorted by keys that do not change under the symmetries
+    (see line_keys), every arrangement that ties on the keys is tried,
+    digits are relabeled in order of first appearance, and the smallest
+    string wins. If more than limit arrangements tie for either
+    orientation of the grid (as with highly symmetric or completely
+    filled boards), trying only some of them would give a form that
+    equivalent boards may not share, so (None, None) is returned.
+    '''
+    grids = []
+
+    for transposed in (False, True):
+        grid = [list(row) for row in zip(*board)] if transposed else board
+        row_keys, col_keys = line_keys(grid)
+
+        if order_count(row_keys) * order_count(col_keys) > limit:
+            return None, None
+        grids.append((transposed, grid, row_keys, col_keys))
+
+    best = None
+
+    for transposed, grid, row_keys, col_keys in grids:
+        for rows, cols in product(line_orders(row_keys), line_orders(col_keys)):
+            relabel = [0] * 10
+            label = 0
+            cells = []
+
+            for r in rows:
+                for c in cols:
+                    value = grid[r][c]
+                    if value and not relabel[value]:
+                        label += 1
+                        relabel[value] = label
+                    cells.append(relabel[value])
+
+            text = "".join(map(str, cells))
+
+            if best is None or text < best[0]:
+                best = text, (transposed, rows, cols, relabel)
+
+    text, (transposed, rows, cols, relabel) = best
+
+    unused = [value for value in range(1, 10) if not relabel[value]]
+    for value, label in zip(unused, range(10 - len(unused), 10)):
+        relabel[value] = label
+
+    return text, (transposed, rows, cols, relabel)
+
+
+def invert_form(text, transform):
+    '''
+    Maps an 81 character board in canonical form (such as the solution
+    of a canonical puzzle) back through the inverse of a transform
+    returned by canonical_form. Returns the board as a 9x9 list.
+    '''
+    transposed, rows, cols, relabel = transform
+
+    original = [0] * 10
+    for value in range(1, 10):
+        original[relabel[value]] = value
+
+    grid = [[0] * 9 for _ in range(9)]
+    for i, r in enumerate(rows):
+        for j, c in enumerate(cols):
+            grid[r][c] = original[int(text[i * 9 + j])]
+
+    return [list(row) for row in zip(*grid)] if transposed else grid
+
+
+class SolutionCache(object):
+    '''
+    Least recently used cache of Sudoku solutions keyed by canonical
+    puzzle strings (see canonical_form). Boards that have been seen
+    exactly as given are also kept under their own string, so that
+    resubmitting them skips canonicalization. Boards with too many
+    symmetric arrangements to put in canonical form are only cached
+    under their own string, and exact_only counts the lookups of such
+    boards. Only 9x9 boards are cached; boards of other sizes are
+    always solved. Pass it to
+    SudokuPuzzle.solve as the cache argument. Optional parameters:
+    - maxsize: Number of puzzles kept before the least recently used
+        one is dropped.
+    - path: JSON file the cache is loaded from (if it exists) and
+        written to by save.
+    '''
+
+    def __init__(self, maxsize=4096, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.exact_only = 0
+
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as fh:
+                for key, solution in json.load(fh).items():
+                    self.remember(key, solution)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def remember(self, key, solution):
+        '''
+        Stores a solution string under a key, dropping the least
+        recently used entry if the cache is full.
+        '''
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get(self, board):
+        '''
+        Returns a solution for a board (as a 9x9 list) if the cache
+        holds one for the board or a board equivalent to it, otherwise
+        returns None.
+        '''
+        if len(board) != 9:
+            return None
+
+        exact = board_to_string(board)
+
+        if exact in self.entries:
+            self.entries.move_to_end(exact)
+            self.hits += 1
+            return board_from_string(self.entries[exact])
+
+        key, transform = canonical_form(board)
+
+        if key is None:
+            self.exact_only += 1
+
+        if key not in self.entries:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        solution = invert_form(self.entries[key], transform)
+        self.remember(exact, board_to_string(solution))
+        return solution
+
+    def put(self, board, solution):
+        '''
+        Stores the solution of a board under the board itself and under
+        the board's canonical form, if it has one.
+        '''
+        if len(board) != 9:
+            return
+
+        self.remember(board_to_string(board), board_to_string(solution))
+
+        key, transform = canonical_form(board)
+        if key is None:
+            return
+        transposed, rows, cols, relabel = transform
+
+        grid = [list(row) for row in zip(*solution)] if transposed \
+            else solution
+
+        self.remember(key, "".join(
+            str(relabel[grid[r][c]]) for r in rows for c in cols
+        ))
+
+    def save(self, path=None):
+        '''
+        Writes the cache to a JSON file, by default the path it was
+        created with.
+        '''
+        with open(path or self.path, "w") as fh:
+            json.dump(self.entries, fh)
@@ -0,0 +1,346 @@
+'''
+Exact cover solving of Sudoku puzzles with Dancing Links.
+
+A Sudoku puzzle is an exact cover problem: every cell, and every value
+in every row, column and subsquare, must be covered exactly once by
+the chosen (cell, value) placements. Knuth's Algorithm X searches for
+such a cover, always branching on the constraint with the fewest
+placements left, and Dancing Links lets it remove and restore those
+placements in place as it backtracks.
+
+Other variants are made by adding constraints. Every extra unit given
+to SudokuCover (such as the two diagonals from diagonal_units) must
+hold each value exactly once; optional units must hold each value at
+most once, which covers cages with no repeated values (killer cage
+sums are not exact cover constraints, and would have to be checked on
+the solutions).
+
+    SudokuCover(board, units=diagonal_units(3)).solve()
+'''
+import math
+
+
+class DancingLinks(object):
+    '''
+    Exact cover problem over primary columns (numbered from 0) that
+    must each be covered exactly once, followed by secondary columns
+    that may be covered at most once. Rows are added with add_row and
+    solutions are found with search.
+
+    Nodes are stored in flat lists of left, right, up and down links
+    rather than as objects. Node 0 is the root, nodes 1 to the number
+    of columns are the column headers and every row adds one node per
+    column it covers. branches counts the rows tried for a column
+    that had more than one row left.
+    '''
+
+    def __init__(self, primary, secondary=0):
+        columns = primary + secondary
+        headers = range(columns + 1)
+
+        self.left = [i - 1 for i in headers]
+        self.right = [i + 1 for i in headers]
+        self.up = list(headers)
+        self.down = list(headers)
+        self.column = list(headers)
+        self.size = [0] * (columns + 1)
+        self.row_of = [None] * (columns + 1)
+        self.rows = []
+        self.branches = 0
+
+        # Close the list of primary headers into a ring through the
+        # root, and leave every secondary header linked only to itself
+        self.left[0] = primary
+        self.right[primary] = 0
+        for header in range(primary + 1, columns + 1):
+            self.left[header] = self.right[header] = header
+
+    def add_row(self, name, columns):
+        '''
+        Method adds a row named name covering the given columns.
+        '''
+        left, right, up, down = self.left, self.right, self.up, self.down
+        row = len(self.rows)
+        first = len(self.column)
+
+        self.rows.append(name)
+
+        for offset, column in enumerate(columns):
+            node = first + offset
+            header = column + 1
+
+            left.append(node - 1 if offset else node)
+            right.append(first)
+            right[left[node]] = node
+            left[first] = node
+
+            up.append(up[header])
+            down.append(header)
+            down[up[header]] = node
+            up[header] = node
+
+            self.column.append(header)
+            self.row_of.append(row)
+            self.size[header] += 1
+
+    def cover(self, header):
+        '''
+        Method removes a column and every row that covers it.
+        '''
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, header):
+        '''
+        Method restores a column removed by cover.
+        '''
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def select(self, node):
+        '''
+        Method covers every other column of the row a node belongs to.
+        '''
+        j = self.right[node]
+        while j != node:
+            self.cover(self.column[j])
+            j = self.right[j]
+
+    def unselect(self, node):
+        '''
+        Method undoes select, uncovering columns in reverse order.
+        '''
+        j = self.left[node]
+        while j != node:
+            self.uncover(self.column[j])
+            j = self.left[j]
+
+    def fewest_rows(self):
+        '''
+        Method returns the header of the primary column with the fewest
+        rows left, or 0 if every primary column is covered.
+        '''
+        right, size = self.right, self.size
+        best, fewest = 0, None
+
+        header = right[0]
+        while header:
+            if fewest is None or size[header] < fewest:
+                best, fewest = header, size[header]
+                if fewest < 2:
+                    break
+            header = right[header]
+
+        return best
+
+    def search(self):
+        '''
+        Generator yielding every exact cover as a list of row names.
+        Backtracking is done with an explicit stack of chosen nodes, so
+        large problems are not limited by the recursion depth. Columns
+        covered while the generator is suspended are restored once it
+        finishes or is closed.
+        '''
+        chosen = []
+
+        try:
+            while True:
+                header = self.fewest_rows()
+
+                if header == 0:
+                    yield [self.rows[self.row_of[node]] for node in chosen]
+                elif self.size[header]:
+                    if self.size[header] > 1:
+                        self.branches += 1
+                    self.cover(header)
+                    node = self.down[header]
+                    chosen.append(node)
+                    self.select(node)
+                    continue
+
+                # Backtrack to the most recent column with a row left
+                while chosen:
+                    node = chosen.pop()
+                    self.unselect(node)
+                    node = self.down[node]
+                    header = self.column[node]
+
+                    if node != header:
+                        self.branches += 1
+                        chosen.append(node)
+                        self.select(node)
+                        break
+
+                    self.uncover(header)
+                else:
+                    return
+        finally:
+            while chosen:
+                node = chosen.pop()
+                self.unselect(node)
+                self.uncover(self.column[node])
+
+
+def diagonal_units(box_size=3):
+    '''
+    Returns the two main diagonals of a board made of box_size x
+    box_size subsquares, as lists of (x, y) locations, for use as
+    extra units of diagonal Sudoku.
+    '''
+    size = box_size * box_size
+    return [
+        [(i, i) for i in range(size)],
+        [(size - 1 - i, i) for i in range(size)],
+    ]
+
+
+class SudokuCover(object):
+    '''
+    Sudoku puzzle set up as an exact cover problem (see DancingLinks).
+    The constraints are that every cell holds a value, and every row,
+    column and subsquare holds each value once. Optional parameters:
+    - box_size: Size of the subsquares. Default is taken from the
+        board (3 for a 9x9 board).
+    - units: Extra lists of (x, y) locations that must each hold
+        every value exactly once (such as diagonal_units).
+    - optional_units: Extra lists of (x, y) locations that may not
+        repeat a value.
+
+    Constraints already met by the clues are left out, along with
+    every placement that would break one, so only the empty cells are
+    searched. consistent is False if the clues themselves repeat a
+    value in a unit (such boards have no solutions).
+    '''
+
+    def __init__(self, board, box_size=None, units=(), optional_units=()):
+        size = len(board)
+        box_size = box_size or math.isqrt(size)
+
+        self.board = [list(row) for row in board]
+        self.size = size
+        self.consistent = True
+
+        cells = [(x, y) for y in range(size) for x in range(size)]
+
+        # Units are numbered rows first, then columns, subsquares and
+        # the extra units
+        members = {(x, y): [y, size + x,
+            2 * size + (y//box_size) * box_size + x//box_size]
+            for x, y in cells}
+        for i, unit in enumerate(units):
+            for cell in unit:
+                members[cell].append(3 * size + i)
+
+        optional = {cell: [] for cell in cells}
+        for i, unit in enumerate(optional_units):
+            for cell in unit:
+                optional[cell].append(i)
+
+        used = [0] * (3 * size + len(units))
+        optional_used = [0] * len(optional_units)
+
+        for x, y in cells:
+            if self.board[y][x]:
+                bit = 1 << self.board[y][x]
+                for masks, unit_numbers in ((used, members[(x, y)]),
+                        (optional_used, optional[(x, y)])):
+                    for unit in unit_numbers:
+                        if masks[unit] & bit:
+                            self.consistent = False
+                        masks[unit] |= bit
+
+        # Columns for the constraints the clues leave to be met: every
+        # empty cell, then every value missing from a unit. Optional
+        # units only get secondary columns.
+        columns = {}
+        for x, y in cells:
+            if not self.board[y][x]:
+                columns[(x, y)] = len(columns)
+        for unit, mask in enumerate(used):
+            for value in range(1, size + 1):
+                if not mask >> value & 1:
+                    columns[(unit, value, None)] = len(columns)
+
+        primary = len(columns)
+        for unit, mask in enumerate(optional_used):
+            for value in range(1, size + 1):
+                if not mask >> value & 1:
+                    columns[(unit, value, "optional")] = len(columns)
+
+        self.links = DancingLinks(primary, len(columns) - primary)
+
+        for x, y in cells:
+            if self.board[y][x]:
+                continue
+
+            blocked = 0
+            for unit in members[(x, y)]:
+                blocked |= used[unit]
+            for unit in optional[(x, y)]:
+                blocked |= optional_used[unit]
+
+            for value in range(1, size + 1):
+                if not blocked >> value & 1:
+                    self.links.add_row((x, y, value), [columns[(x, y)]] +
+                        [columns[(unit, value, None)]
+                            for unit in members[(x, y)]] +
+                        [columns[(unit, value, "optional")]
+                            for unit in optional[(x, y)]])
+
+    def solutions(self):
+        '''
+        Generator yielding every solution of the board as a list of
+        rows. The board given to the cover is not changed.
+        '''
+        if not self.consistent:
+            return
+
+        for placements in self.links.search():
+            board = [list(row) for row in self.board]
+            for x, y, value in placements:
+                board[y][x] = value
+            yield board
+
+    def solve(self):
+        '''
+        Returns the first solution found, or None if there is none.
+        '''
+        return next(self.solutions(), None)
+
+    def count_solutions(self, limit=2):
+        '''
+        Counts the solutions of the board, stopping once limit have
+        been found.
+        '''
+        count = 0
+        for _ in self.solutions():
+            count += 1
+            if count >= limit:
+                break
+        return count
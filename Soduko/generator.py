@@ -0,0 +1,187 @@
+'''
+Sudoku puzzle generator.
+
+Puzzles are made by filling a random solved grid and then removing
+clues for as long as the puzzle keeps exactly one solution. Every
+uniqueness check runs on a single BitmaskEngine that has clues taken
+away and put back in place, so no puzzles or boards are copied while
+generating. Finished puzzles are graded by how much work the "mrv"
+engine needs to solve them.
+
+    python generator.py --count 10 --difficulty hard --seed 1
+'''
+import argparse
+import random
+
+from soduko import SudokuPuzzle, BitmaskEngine, board_to_string
+
+
+DIFFICULTIES = ("easy", "medium", "hard", "expert")
+
+
+def random_solution(rng, box_size=3):
+    '''
+    Returns a random solved board made of box_size x box_size
+    subsquares (9x9 by default), filled by the engine's search with
+    the candidates of each guess tried in a random order.
+    '''
+    engine = BitmaskEngine(box_size=box_size)
+
+    def fill(changed):
+        mark = len(engine.trail)
+
+        if engine.propagate(changed):
+            if engine.all_filled():
+                return True
+
+            x, y = engine.fewest_candidates()
+            digits = list(engine.digits(engine.candidate_mask(x, y)))
+            rng.shuffle(digits)
+
+            for each in digits:
+                guess = len(engine.trail)
+                engine.assign(x, y, each)
+
+                if fill([(x, y)]):
+                    return True
+
+                engine.undo(guess)
+
+        engine.undo(mark)
+        return False
+
+    fill(None)
+    return engine.board
+
+
+def has_other_solution(engine, x, y, value):
+    '''
+    Returns True if the engine's board, whose cell (x, y) has just been
+    emptied, can be solved with something other than value in that
+    cell. The board is left as it was.
+    '''
+    for each in engine.digits(engine.candidate_mask(x, y)):
+        if each == value:
+            continue
+
+        guess = len(engine.trail)
+        engine.assign(x, y, each)
+        found = engine.count_solutions(1, [(x, y)])
+        engine.undo(guess)
+
+        if found:
+            return True
+
+    return False
+
+
+def remove_clues(solution, rng, symmetric=True, min_clues=17):
+    '''
+    Removes clues from a solved board in a random order, putting back
+    any clue whose removal would allow a second solution, and returns
+    the resulting puzzle. With symmetric, clues are removed in pairs
+    that mirror each other through the centre of the board.
+    '''
+    engine = BitmaskEngine(SudokuPuzzle(solution))
+    last = engine.size - 1
+    clues = engine.size ** 2
+
+    cells = [(x, y) for y in range(engine.size) for x in range(engine.size)]
+    rng.shuffle(cells)
+
+    for x, y in cells:
+        group = {(x, y), (last - x, last - y)} if symmetric else {(x, y)}
+
+        if engine.board[y][x] == 0 or clues - len(group) < min_clues:
+            continue
+
+        removed = []
+        unique = True
+
+        for cell_x, cell_y in group:
+            value = engine.board[cell_y][cell_x]
+            engine.unassign(cell_x, cell_y)
+            removed.append((cell_x, cell_y, value))
+
+        for cell_x, cell_y, value in removed:
+            if has_other_solution(engine, cell_x, cell_y, value):
+                unique = False
+                break
+
+        if unique:
+            clues -= len(group)
+            continue
+
+        for cell_x, cell_y, value in removed:
+            engine.assign(cell_x, cell_y, value)
+            engine.trail.pop() # Clues are part of the board, not guesses
+
+    return [row[:] for row in engine.board]
+
+
+def grade(board):
+    '''
+    Grades a puzzle by solving it with the "mrv" engine. Returns a
+    tuple of the difficulty and the SolveStats of the solve:
+    - easy: naked singles alone solve it.
+    - medium: hidden singles are needed, but no guesses.
+    - hard: up to 3 guesses are needed.
+    - expert: more than 3 guesses are needed.
+    '''
+    stats = SudokuPuzzle(board).solve([], engine="mrv", stats=True)
+
+    if stats.branches > 3:
+        return "expert", stats
+    if stats.branches:
+        return "hard", stats
+    if stats.fills.get("hidden_single"):
+        return "medium", stats
+    return "easy", stats
+
+
+def generate(seed=None, difficulty=None, symmetric=True, attempts=100):
+    '''
+    Generates a puzzle with exactly one solution and returns a tuple of
+    the board, its difficulty and its SolveStats (see grade).
+    Optional parameters:
+    - seed: Seed or random.Random object to generate from.
+    - difficulty: One of DIFFICULTIES. Puzzles are generated until
+        one of this difficulty is found, up to attempts times.
+        Default is any difficulty.
+    - symmetric: Remove clues in symmetric pairs.
+    '''
+    rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+
+    for _ in range(attempts):
+        board = remove_clues(random_solution(rng), rng, symmetric)
+        level, stats = grade(board)
+
+        if difficulty is None or level == difficulty:
+            return board, level, stats
+
+    raise ValueError(
+        f"No {difficulty} puzzle found in {attempts} attempts."
+    ) from ValueError
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles.")
+    parser.add_argument("-n", "--count", type=int, default=1,
+        help="number of puzzles to generate")
+    parser.add_argument("-d", "--difficulty", choices=DIFFICULTIES,
+        help="only keep puzzles of this difficulty")
+    parser.add_argument("--seed", type=int, help="random seed")
+    parser.add_argument("--asymmetric", action="store_true",
+        help="remove clues one at a time instead of in symmetric pairs")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+
+    for number in range(args.count):
+        board, level, stats = generate(rng, args.difficulty,
+            not args.asymmetric)
+        print(f"{level}_{number} {board_to_string(board).replace('0', '.')}")
+
+
+if __name__ == "__main__":
+    main()
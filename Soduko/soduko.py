@@ -1,4 +1,8 @@
 import copy
+import math
+import time
+import tracemalloc
+from collections import deque
 
 
 class TooManyChoices(Exception):
@@ -11,23 +15,115 @@ class UnsolvablePuzzle(Exception):
     pass
 
 
+class SolveStats(object):
+    '''
+    Measurements taken while solving a puzzle, returned by
+    SudokuPuzzle.solve when its stats argument is given.
+    - engine: Name of the solver engine used.
+    - seconds: Wall time spent solving.
+    - branches: Number of guesses made by the brute force fallback.
+    - fills: Number of cells filled by each strategy, keyed by the
+        strategy's name. The "mrv" engine also counts the cells it
+        fills itself as "naked_single" and "hidden_single".
+    - peak_memory: Peak number of bytes allocated while solving, if
+        tracemalloc was tracing (otherwise None).
+    '''
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.seconds = 0.0
+        self.branches = 0
+        self.fills = {}
+        self.peak_memory = None
+
+    def __repr__(self) -> str:
+        return (
+            f"SolveStats(engine={self.engine!r}, seconds={self.seconds:.6f}, "
+            f"branches={self.branches}, fills={self.fills}, "
+            f"peak_memory={self.peak_memory})"
+        )
+
+    def filled(self, name, count=1):
+        '''
+        Method adds to the number of cells filled by a strategy.
+        '''
+        self.fills[name] = self.fills.get(name, 0) + count
+
+    def counter(self, strategy):
+        '''
+        Method returns a version of a strategy that counts the cells
+        it fills under the strategy's name.
+        '''
+        name = getattr(strategy, "__name__", repr(strategy))
+        self.fills.setdefault(name, 0)
+
+        def counted(puzzle, x, y):
+            value = strategy(puzzle, x, y)
+            self.fills[name] += 1
+            return value
+
+        counted.__name__ = name
+        return counted
+
+    def measure(self, function, *args):
+        '''
+        Method calls a function, adding the time it takes to seconds and
+        recording its peak memory use if tracemalloc is tracing.
+        '''
+        tracing = tracemalloc.is_tracing()
+
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+
+        try:
+            return function(*args)
+        finally:
+            self.seconds += time.perf_counter() - start
+            if tracing:
+                self.peak_memory = tracemalloc.get_traced_memory()[1] - before
+
+
 class SudokuPuzzle(object):
-    def __init__(self, board: list = None):
+    __slots__ = ("board", "box_size", "masks")
+
+    def __init__(self, board: list = None, box_size: int = None):
         """
         Make a copy of the input board. If input board is None, create board of 0s.
 
+        Boards are made of box_size x box_size subsquares, so have
+        box_size**2 rows, columns and values (3 gives a 9x9 board).
+        If box_size is not given, it is taken from the size of the
+        input board.
+
         Original method supplied by Mark Hutchison and Dr. Nicholas Moore from the 1MD3 Course 2022
         """
+        if box_size is None:
+            box_size = box_size_of(board)
+
+        size = box_size * box_size
+        self.box_size: int = box_size
+        self.masks = None # CandidateMasks, while the trail engine runs
+
         if board is not None and \
-                len(board) == 9 and \
-                all(len(row) == 9 for row in board) and \
-                all(0 <= board[row][col] <= 9
-                    for col in range(9)
-                    for row in range(9)
+                len(board) == size and \
+                all(len(row) == size for row in board) and \
+                all(0 <= board[row][col] <= size
+                    for col in range(size)
+                    for row in range(size)
                 ):
             self.board: list = [[cell for cell in row] for row in board]
         else:
-            self.board: list = [[0 for _ in range(9)] for _ in range(9)]
+            self.board: list = [[0 for _ in range(size)] for _ in range(size)]
+
+    @property
+    def size(self) -> int:
+        '''
+        Number of rows, columns and values of the board.
+        '''
+        return self.box_size * self.box_size
 
     def __str__(self) -> str:
         '''
@@ -35,16 +131,20 @@ class SudokuPuzzle(object):
 
         Original method supplied by Mark Hutchison and Dr. Nicholas Moore from the 1MD3 Course 2022
         '''
-        puzzle: str = "╔" + ("═══╦" * 8) + "═" * 3 + "╗\n"
+        last = self.size - 1
+        width = len(str(self.size)) # Values above 9 take more than one column
+        line = "═" * (width + 2)
+
+        puzzle: str = "╔" + ((line + "╦") * last) + line + "╗\n"
         for row_index, row in enumerate(self.board):
             puzzle += "║"
             for col_index, cell in enumerate(row):
-                puzzle += f" {cell if cell not in [0, None] else ' '} ║"
-            if row_index < 8:
-                puzzle += "\n╠" + ("═══╬" * 8) + "═══╣\n"
+                puzzle += f" {cell if cell not in [0, None] else ' ':>{width}} ║"
+            if row_index < last:
+                puzzle += "\n╠" + ((line + "╬") * last) + line + "╣\n"
             else:
                 puzzle += '\n'
-        return puzzle + "╚" + "═══╩" * 8 + "═" * 3 + "╝\n"
+        return puzzle + "╚" + (line + "╩") * last + line + "╝\n"
 
     def __eq__(self, other) -> bool:
         '''
@@ -52,10 +152,10 @@ class SudokuPuzzle(object):
 
         # Original method supplied by Mark Hutchison and Dr. Nicholas Moore from the 1MD3 Course 2022
         '''
-        return all(
+        return len(self.board) == len(other.board) and all(
             self.board[row][col] == other.board[row][col]
-            for row in range(9) 
-            for col in range(9)
+            for row in range(self.size) 
+            for col in range(self.size)
         )
 
 
@@ -63,6 +163,8 @@ class SudokuPuzzle(object):
         '''
         Method returns true if all cells are filled with a nonzero entry.
         '''
+        if self.masks is not None:
+            return self.masks.empty == 0
         return 0 not in [x for row in self.board for x in row]
 
 
@@ -87,56 +189,338 @@ class SudokuPuzzle(object):
     def sub_square_check(self, x, y, value):
         '''
         Method returns true if a given value at a given location does
-        not already occur in it's parent 3x3 subsquare.        
+        not already occur in it's parent subsquare.        
         '''
-        top_x = (x//3) * 3
-        top_y = (y//3) * 3
+        box = self.box_size
+        top_x = (x//box) * box
+        top_y = (y//box) * box
         
-        subsquare = [self.board[ran_y][top_x:top_x+3] for ran_y in range(top_y, top_y+3)]
+        subsquare = [self.board[ran_y][top_x:top_x+box] for ran_y in range(top_y, top_y+box)]
 
         return value not in [x for row in subsquare for x in row]
 
-    def apply_strategy(self, strategy):
+    def candidates(self, x, y):
+        '''
+        Method returns the set of values that could be placed at a
+        given location without repeating a value in its row, column
+        or subsquare.
+        '''
+        if self.masks is not None:
+            return set(self.masks.geometry.digits(self.masks.candidates(x, y)))
+
+        nums = set(range(1, self.size+1))
+
+        for i in range(1, self.size+1):
+
+            if not self.horizontal_check(y, i) or \
+                    not self.vertical_check(x, i) or \
+                    not self.sub_square_check(x, y, i):
+                nums.discard(i)
+
+        return nums
+
+    def apply_strategy(self, strategy, trail=None):
         '''
         Method applies a given strategy to an entire board, mutating
         any cells for which a strategy works. Returns True only if at
         least one cell was sucessfully motated for the given strategy.
+
+        If a trail list is supplied, the (x, y) location of every
+        mutated cell is appended to it so the changes can be undone.
         '''
         passed = False
         
-        for x in range(9):
-            for y in range(9):
+        for x in range(self.size):
+            for y in range(self.size):
                 if self.board[y][x] == 0:
                     try:
-                        self.board[y][x] = strategy(self, x, y)
+                        self.place(x, y, strategy(self, x, y), trail)
                         passed = True
                     except Exception:
                         pass
                 
         return passed
 
-    def solve(self, strategies):
+    def apply_strategies(self, strategies, trail=None, changed=None):
+        '''
+        Method applies a list of strategies using a work queue of
+        cells instead of passes over the whole board. Each queued cell
+        is given to the strategies in order until one of them fills
+        it, and filling a cell queues its peers (the other cells in
+        its row, column and subsquare, 20 on a 9x9 board) to be looked
+        at again.
+        Returns True only if at least one cell was mutated.
+
+        The queue starts with every empty cell, or with only the peers
+        of the cells listed in changed if it is given. Strategies that
+        depend on more than a cell's peers may miss a deduction that a
+        full pass of apply_strategy would find.
+
+        If a trail list is supplied, the (x, y) location of every
+        mutated cell is appended to it so the changes can be undone.
+        '''
+        passed = False
+        size = self.size
+        peers = geometry_for(self.box_size).peers
+
+        if changed is None:
+            queue = deque(
+                (x, y) for x in range(size) for y in range(size)
+                if self.board[y][x] == 0
+            )
+        else:
+            queue = deque(peer for x, y in changed for peer in peers[y][x])
+
+        while queue:
+            x, y = queue.popleft()
+
+            if self.board[y][x] != 0:
+                continue
+
+            for strategy in strategies:
+                try:
+                    value = strategy(self, x, y)
+                except Exception:
+                    continue
+
+                self.place(x, y, value, trail)
+                passed = True
+                queue.extend(peers[y][x])
+                break
+
+        return passed
+
+    def place(self, x, y, value, trail=None):
+        '''
+        Method fills an empty cell with a value, marking it on the
+        candidate masks (if the trail engine is running) and recording
+        its location on trail if one is supplied.
+        '''
+        self.board[y][x] = value
+        if self.masks is not None:
+            self.masks.add(x, y, value)
+        if trail is not None:
+            trail.append((x, y))
+
+    def undo(self, trail, mark=0):
+        '''
+        Method empties every cell recorded on a trail after position
+        mark, restoring the board (and the candidate masks) to how they
+        were when the trail had that length.
+        '''
+        board, masks = self.board, self.masks
+        while len(trail) > mark:
+            x, y = trail.pop()
+            if masks is not None:
+                masks.remove(x, y, board[y][x])
+            board[y][x] = 0
+
+    def search(self, strategies, trail, incremental=False, changed=None,
+            stats=None):
+        '''
+        In-place version of the brute force search used by solve.
+        Every cell filled is recorded on the trail, and the cells
+        filled by a failed guess are emptied again before the next
+        guess is tried, so no copies of the board are made.
+
+        If incremental is True, strategies are applied with
+        apply_strategies, starting from the peers of the cells in
+        changed (or the whole board if changed is None).
+
+        Guesses are counted on stats (a SolveStats) if it is given.
+
+        Returns True if the board was solved, or False (with the board
+        restored to how it was when called) if there is no solution.
+        '''
+        mark = len(trail)
+
+        while not self.all_filled():
+
+            stale = True
+
+            if incremental:
+                if self.apply_strategies(strategies, trail, changed):
+                    stale = False
+                changed = ()
+            else:
+                for strategy in strategies:
+                    if self.apply_strategy(strategy, trail):
+                        stale = False
+
+            if stale:
+
+                x, y = next(
+                    (x, y) for y in range(self.size) for x in range(self.size)
+                    if self.board[y][x] == 0
+                )
+
+                for each in sorted(self.candidates(x, y)):
+
+                    guess = len(trail)
+                    self.place(x, y, each, trail)
+
+                    if stats is not None:
+                        stats.branches += 1
+
+                    if self.search(strategies, trail, incremental, [(x, y)],
+                            stats):
+                        return True
+
+                    self.undo(trail, guess)
+
+                self.undo(trail, mark)
+                return False
+
+        return True
+
+    def count_solutions(self, limit=2):
+        '''
+        Counts the solutions of the board, stopping once limit have
+        been found (so count_solutions() == 1 means the puzzle has
+        exactly one solution). Uses the bitmask engine with singles
+        propagation and leaves the board unchanged.
+        '''
+        return BitmaskEngine(self).count_solutions(limit)
+
+    def solve(self, strategies, engine="classic", incremental=False,
+            cache=None, stats=False):
         '''
         Attempts to solve a board given a list of strategies.
         If the board cannot be solved by alternating between the
         provided strategies, it will attempt a recursive brute force
         solution (while using the provided strategies to optimize time).
 
+        The engine argument selects how the search is carried out:
+        - "classic": scans the board for every candidate check.
+        - "trail": same as "classic", but backtracks in place by
+            undoing the cells recorded on a trail instead of copying
+            the puzzle for every guess, and keeps the values used in
+            each row, column and subsquare as bitmasks on the way (see
+            CandidateMasks) instead of scanning the board for them.
+        - "bitmask": tracks row, column and subsquare occupancy as
+            bitmasks (see BitmaskEngine). Also backtracks in place.
+        - "mrv": bitmask engine that fills naked and hidden singles
+            after every assignment, stops a branch as soon as any cell
+            or value has nowhere left to go, and guesses on the cell
+            with the fewest candidates (see BitmaskEngine.search_mrv).
+        - "dlx": exact cover search with Dancing Links, branching on
+            whichever cell or unit value has the fewest placements left
+            (see dlx.SudokuCover). Strategies are not used.
+        The "classic", "trail" and "bitmask" engines give the same
+        result. "mrv" and "dlx" explore the board in a different order,
+        so on a puzzle with several solutions they may find a different
+        one.
+
+        If incremental is True, strategies are applied through a work
+        queue of cells (see apply_strategies) so that only the peers of
+        newly filled cells are revisited, rather than the whole board on
+        every pass.
+
+        If a cache (such as cache.SolutionCache) is given, a solution
+        it holds for this board, or for any board equivalent to it under
+        Sudoku symmetries, is used instead of searching, and any new
+        solution found is added to it.
+
+        If stats is True, a SolveStats object recording the time taken,
+        the number of guesses made and the cells filled by each strategy
+        is returned instead of True. An existing SolveStats object may
+        be passed instead, so that it is still filled in when an
+        exception is raised.
+
         If a board is invalid (cannot be solved even with brute force),
         it will raise a UnsolvablePuzzle exception.
         '''
 
+        if not stats:
+            return self.run_engine(strategies, engine, incremental, cache)
+
+        if stats is True:
+            stats = SolveStats()
+
+        stats.engine = engine
+
+        stats.measure(self.run_engine,
+            [stats.counter(strategy) for strategy in strategies],
+            engine, incremental, cache, stats)
+
+        return stats
+
+    def run_engine(self, strategies, engine="classic", incremental=False,
+            cache=None, stats=None):
+        '''
+        Does the work of solve with the given engine, counting guesses
+        on stats if it is given. Returns True, or raises an
+        UnsolvablePuzzle exception.
+        '''
+
+        if cache is not None:
+            original = [list(row) for row in self.board]
+            solution = cache.get(original)
+
+            if solution is not None:
+                self.board = solution
+                return True
+
+            self.run_engine(strategies, engine, incremental, None, stats)
+            cache.put(original, self.board)
+            return True
+
+        if engine in ("bitmask", "mrv"):
+            solver = BitmaskEngine(self, stats)
+            solver.solve(strategies, mrv=(engine == "mrv"),
+                incremental=incremental)
+            self.board = solver.board
+            return True
+
+        elif engine == "dlx":
+            from dlx import SudokuCover
+
+            cover = SudokuCover(self.board, self.box_size)
+            solution = cover.solve()
+
+            if stats is not None:
+                stats.branches += cover.links.branches
+            if solution is None:
+                raise UnsolvablePuzzle
+
+            self.board = solution
+            return True
+
+        elif engine == "trail":
+            self.masks = CandidateMasks(self.board, self.box_size)
+            try:
+                solved = self.search(strategies, [], incremental, None, stats)
+            finally:
+                self.masks = None
+
+            if not solved:
+                raise UnsolvablePuzzle
+            return True
+
+        elif engine == "classic":
+            return self.brute_force(strategies, incremental, stats)
+
+        raise ValueError(f"Unknown solver engine: {engine}")
+
+    def brute_force(self, strategies, incremental=False, stats=None):
+        '''
+        The "classic" engine of solve: alternates between strategies,
+        then tries every candidate of the first empty cell on a copy of
+        the puzzle, recursing until a copy is solved. Guesses are
+        counted on stats if it is given.
+        '''
+
         def target(self):
 
-            for y in range(9):
-                for x in range(9):
+            for y in range(self.size):
+                for x in range(self.size):
 
                     if self.board[y][x] != 0:
                         continue
 
-                    nums = {1,2,3,4,5,6,7,8,9}
+                    nums = set(range(1, self.size+1))
         
-                    for i in range(1, 9+1):
+                    for i in range(1, self.size+1):
                         
                         if not self.horizontal_check(y, i) or \
                                 not self.vertical_check(x, i) or \
@@ -150,10 +534,14 @@ class SudokuPuzzle(object):
         
             stale = True
 
-            for strategy in strategies:
-                test = self.apply_strategy(strategy)
-                if test:
+            if incremental:
+                if self.apply_strategies(strategies):
                     stale = False
+            else:
+                for strategy in strategies:
+                    test = self.apply_strategy(strategy)
+                    if test:
+                        stale = False
 
             if stale:
 
@@ -168,8 +556,11 @@ class SudokuPuzzle(object):
                     new_board = copy.deepcopy(self)
                     new_board.board[y][x] = each
 
+                    if stats is not None:
+                        stats.branches += 1
+
                     try:
-                        new_board.solve(strategies)
+                        new_board.brute_force(strategies, incremental, stats)
                         
                         self.board = new_board.board
                         
@@ -182,6 +573,792 @@ class SudokuPuzzle(object):
         return True
 
 
+class CompactBoard(object):
+    '''
+    Rows of a CompactSudokuPuzzle, made when asked for: indexing it
+    gives a memoryview of one row of the puzzle's cells, so it can be
+    used like the list of lists board of a SudokuPuzzle.
+    '''
+    __slots__ = ("cells", "size")
+
+    def __init__(self, cells, size):
+        self.cells = cells
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[index] for index in range(*row.indices(self.size))]
+        if row < 0:
+            row += self.size
+        if not 0 <= row < self.size:
+            raise IndexError("board row out of range")
+        return memoryview(self.cells)[row * self.size:(row + 1) * self.size]
+
+    def __iter__(self):
+        view = memoryview(self.cells)
+        for start in range(0, len(self.cells), self.size):
+            yield view[start:start + self.size]
+
+
+class CompactSudokuPuzzle(SudokuPuzzle):
+    '''
+    SudokuPuzzle that stores its cells as bytes (row-major, 81 for a
+    9x9 board) in a single bytearray instead of a list of lists, about
+    200 bytes a puzzle against about 1900. The board attribute is a
+    CompactBoard over those bytes, made each time it is read, so every
+    SudokuPuzzle method and strategy works on it unchanged. Assigning
+    a board copies its values into the bytes.
+
+    The board may be given as a list of rows (as for SudokuPuzzle) or
+    as bytes. Copies and comparisons work on the bytes directly, and
+    compact puzzles can be hashed by their contents (so should not be
+    changed while used as a dictionary key).
+    '''
+    __slots__ = ("cells",)
+
+    def __init__(self, board=None, box_size=None):
+        if box_size is None:
+            box_size = box_size_of(board)
+
+        size = box_size * box_size
+        self.box_size = box_size
+
+        try:
+            if isinstance(board, (bytes, bytearray)):
+                cells = bytearray(board)
+            else:
+                cells = bytearray(cell for row in board for cell in row)
+            if len(cells) != size * size or max(cells) > size:
+                cells = bytearray(size * size)
+        except Exception:
+            cells = bytearray(size * size)
+
+        self.cells = cells
+        self.masks = None
+
+    @property
+    def board(self):
+        return CompactBoard(self.cells, self.box_size * self.box_size)
+
+    @board.setter
+    def board(self, board):
+        cells = bytes(cell for row in board for cell in row)
+        if len(cells) != len(self.cells):
+            raise ValueError("Board does not match the size of the puzzle.")
+        self.cells[:] = cells
+
+    def __eq__(self, other) -> bool:
+        '''
+        Allows two soduko boards to be equated.
+        '''
+        if isinstance(other, CompactSudokuPuzzle):
+            return self.cells == other.cells
+        return super().__eq__(other)
+
+    def __hash__(self) -> int:
+        return hash(bytes(self.cells))
+
+    def __copy__(self):
+        return CompactSudokuPuzzle(self.cells)
+
+    def __deepcopy__(self, memo):
+        return CompactSudokuPuzzle(self.cells)
+
+    def __reduce__(self):
+        return CompactSudokuPuzzle, (bytes(self.cells),)
+
+    def all_filled(self) -> bool:
+        '''
+        Method returns true if all cells are filled with a nonzero entry.
+        '''
+        return 0 not in self.cells
+
+    def horizontal_check(self, row, value):
+        '''
+        Method returns true if a given value does not already occur
+        in a specified row.
+        '''
+        size = self.box_size * self.box_size
+        return value not in self.cells[row * size:(row + 1) * size]
+
+    def vertical_check(self, col, value):
+        '''
+        Method returns true if a given value does not already occur
+        in a specified column.
+        '''
+        return value not in self.cells[col::self.box_size * self.box_size]
+
+    def sub_square_check(self, x, y, value):
+        '''
+        Method returns true if a given value at a given location does
+        not already occur in it's parent subsquare.
+        '''
+        box = self.box_size
+        size = box * box
+        start = (y // box) * box * size + (x // box) * box
+
+        return all(
+            value not in self.cells[row:row + box]
+            for row in range(start, start + box * size, size)
+        )
+
+
+MASK_DIGITS = [
+    tuple(i for i in range(1, 9+1) if mask >> i & 1)
+    for mask in range(1 << 10)
+] # Digits contained in every possible mask, in ascending order
+
+MASK_COUNTS = bytes(len(digits) for digits in MASK_DIGITS)
+
+
+def mask_digits(mask):
+    '''
+    Returns the digits contained in a mask of any size, in ascending
+    order. MASK_DIGITS is used instead for masks of up to 9 digits.
+    '''
+    digits = []
+    while mask:
+        low = mask & -mask
+        digits.append(low.bit_length() - 1)
+        mask ^= low
+    return digits
+
+
+def mask_count(mask):
+    '''
+    Returns the number of digits contained in a mask of any size.
+    '''
+    return bin(mask).count("1")
+
+
+def box_size_of(board):
+    '''
+    Returns the subsquare size of a board given as a list of rows or as
+    bytes of cells (2 for 4x4, 3 for 9x9, 4 for 16x16 and so on), or 3
+    if the board is None or not the size of a Sudoku board.
+    '''
+    try:
+        cells = len(board) if isinstance(board, (bytes, bytearray)) \
+            else len(board) ** 2
+    except TypeError:
+        return 3
+
+    box_size = math.isqrt(math.isqrt(cells))
+    return box_size if box_size > 1 and box_size ** 4 == cells else 3
+
+
+class Geometry(object):
+    '''
+    Lookup tables for a board made of box_size x box_size subsquares,
+    shared by every puzzle and engine of that size (see geometry_for).
+    - size: Number of rows, columns and values (box_size**2).
+    - all_digits: Mask with bits 1 through size set, one per value.
+    - box_index: Subsquare number of every cell, as box_index[y][x].
+    - units: Every row, column and subsquare as a list of (x, y)
+        locations, in that order.
+    - peers: The cells sharing a row, column or subsquare with each
+        cell, as peers[y][x].
+    - affected_units: Mask of the units whose candidates can change
+        when a cell is filled, as affected_units[y][x].
+    - digits, count: Functions returning the digits in a mask (in
+        ascending order) and how many there are. Boards up to 9x9 use
+        the MASK_DIGITS and MASK_COUNTS tables.
+    '''
+
+    def __init__(self, box_size=3):
+        size = box_size * box_size
+        cells = range(size)
+
+        self.box_size = box_size
+        self.size = size
+        self.all_digits = (1 << size + 1) - 2
+
+        self.box_index = [[(y//box_size) * box_size + x//box_size
+            for x in cells] for y in cells]
+
+        self.units = [[(x, y) for x in cells] for y in cells] + \
+            [[(x, y) for y in cells] for x in cells] + \
+            [[(top_x + x, top_y + y)
+                for y in range(box_size) for x in range(box_size)]
+                for top_y in range(0, size, box_size)
+                for top_x in range(0, size, box_size)]
+
+        self.peers = [[tuple(
+            (px, py) for py in cells for px in cells
+            if (px, py) != (x, y) and (px == x or py == y or
+                self.box_index[py][px] == self.box_index[y][x])
+            ) for x in cells] for y in cells]
+
+        own_units = [[1 << y | 1 << size + x | 1 << 2 * size + box
+            for x, box in enumerate(row)] for y, row in enumerate(self.box_index)]
+
+        def affected(x, y):
+            mask = own_units[y][x]
+            for px, py in self.peers[y][x]:
+                mask |= own_units[py][px]
+            return mask
+
+        self.affected_units = [[affected(x, y) for x in cells] for y in cells]
+
+        if size <= 9:
+            self.digits = MASK_DIGITS.__getitem__
+            self.count = MASK_COUNTS.__getitem__
+        else:
+            self.digits = mask_digits
+            self.count = mask_count
+
+
+class CandidateMasks(object):
+    '''
+    Values used in each row, column and subsquare of a board, as
+    bitmasks with bit v set once value v is used, and the number of
+    empty cells. The trail engine keeps them up to date as it fills and
+    empties cells (see SudokuPuzzle.place and SudokuPuzzle.undo), so
+    finding the candidates of a cell costs a few integer operations
+    instead of a scan of the board.
+    '''
+    __slots__ = ("geometry", "rows", "cols", "boxes", "empty")
+
+    def __init__(self, board, box_size=3):
+        geometry = self.geometry = geometry_for(box_size)
+        self.rows = [0] * geometry.size
+        self.cols = [0] * geometry.size
+        self.boxes = [0] * geometry.size
+        self.empty = geometry.size * geometry.size
+
+        for y, row in enumerate(board):
+            for x, value in enumerate(row):
+                if value:
+                    self.add(x, y, value)
+
+    def add(self, x, y, value):
+        '''
+        Method marks a value as used by the cell at a given location.
+        '''
+        bit = 1 << value
+        self.rows[y] |= bit
+        self.cols[x] |= bit
+        self.boxes[self.geometry.box_index[y][x]] |= bit
+        self.empty -= 1
+
+    def remove(self, x, y, value):
+        '''
+        Method marks a value as no longer used by the cell at a given
+        location, undoing add.
+        '''
+        bit = ~(1 << value)
+        self.rows[y] &= bit
+        self.cols[x] &= bit
+        self.boxes[self.geometry.box_index[y][x]] &= bit
+        self.empty += 1
+
+    def candidates(self, x, y):
+        '''
+        Method returns the mask of values not yet used in the row,
+        column or subsquare of a given location.
+        '''
+        return self.geometry.all_digits & ~(self.rows[y] | self.cols[x] |
+            self.boxes[self.geometry.box_index[y][x]])
+
+
+GEOMETRIES = {}
+
+
+def geometry_for(box_size):
+    '''
+    Returns the Geometry of boards made of box_size x box_size
+    subsquares, building it the first time it is asked for.
+    '''
+    if box_size not in GEOMETRIES:
+        GEOMETRIES[box_size] = Geometry(box_size)
+    return GEOMETRIES[box_size]
+
+
+STANDARD = geometry_for(3)
+
+ALL_DIGITS = STANDARD.all_digits # Bits 1 through 9, one per digit
+BOX_INDEX = STANDARD.box_index
+UNITS = STANDARD.units # Every row, column and 3x3 subsquare
+PEERS = STANDARD.peers # The 20 cells sharing a row, column or subsquare
+AFFECTED_UNITS = STANDARD.affected_units
+
+
+class BitmaskEngine(object):
+    '''
+    Solver state built from a SudokuPuzzle of any size (or an empty
+    board made of box_size x box_size subsquares if no puzzle is
+    given). Alongside a copy of the board it keeps a mask of the
+    values used in every row, column and subsquare (bit i is set if
+    value i is present).
+    The masks are updated as cells are assigned and cleared, so
+    checking a value or listing the candidates for a cell costs a
+    few integer operations instead of a scan of the board.
+
+    Every assignment is recorded on a trail so that a failed guess can
+    be rolled back in place with undo, without copying the board.
+    consistent is False if the starting board repeats a value in a
+    row, column or subsquare.
+    Guesses (and cells filled by propagate) are counted on stats, a
+    SolveStats object, if one is given.
+
+    The engine offers the same board and check methods as
+    SudokuPuzzle, so any strategy written for SudokuPuzzle can be
+    applied to it unchanged.
+    '''
+
+    def __init__(self, puzzle=None, stats=None, box_size=3):
+        if puzzle:
+            box_size = puzzle.box_size
+
+        geometry = geometry_for(box_size)
+        size = geometry.size
+
+        self.box_size = box_size
+        self.size = size
+        self.all_digits = geometry.all_digits
+        self.box_index = geometry.box_index
+        self.units = geometry.units
+        self.peers = geometry.peers
+        self.affected_units = geometry.affected_units
+        self.digits = geometry.digits
+        self.count = geometry.count
+
+        self.board = [list(row) for row in puzzle.board] if puzzle \
+            else [[0 for _ in range(size)] for _ in range(size)]
+        self.stats = stats
+        self.rows = [0] * size
+        self.cols = [0] * size
+        self.boxes = [0] * size
+        self.empty = 0
+        self.trail = []
+        self.consistent = True
+
+        for y in range(size):
+            for x in range(size):
+                value = self.board[y][x]
+                if value == 0:
+                    self.empty += 1
+                else:
+                    bit = 1 << value
+                    if (self.rows[y] | self.cols[x] |
+                            self.boxes[self.box_index[y][x]]) & bit:
+                        self.consistent = False
+                    self.rows[y] |= bit
+                    self.cols[x] |= bit
+                    self.boxes[self.box_index[y][x]] |= bit
+
+    def assign(self, x, y, value):
+        '''
+        Method places a value in an empty cell, marks it as used in the
+        cell's row, column and subsquare and records it on the trail.
+        '''
+        bit = 1 << value
+        self.board[y][x] = value
+        self.rows[y] |= bit
+        self.cols[x] |= bit
+        self.boxes[self.box_index[y][x]] |= bit
+        self.empty -= 1
+        self.trail.append((x, y))
+
+    def unassign(self, x, y):
+        '''
+        Method empties a previously assigned cell, undoing assign.
+        '''
+        bit = ~(1 << self.board[y][x])
+        self.board[y][x] = 0
+        self.rows[y] &= bit
+        self.cols[x] &= bit
+        self.boxes[self.box_index[y][x]] &= bit
+        self.empty += 1
+
+    def undo(self, mark=0):
+        '''
+        Method unassigns every cell recorded on the trail after
+        position mark, most recent first.
+        '''
+        trail = self.trail
+        while len(trail) > mark:
+            x, y = trail.pop()
+            self.unassign(x, y)
+
+    def all_filled(self) -> bool:
+        '''
+        Method returns true if all cells are filled with a nonzero entry.
+        '''
+        return self.empty == 0
+
+    def horizontal_check(self, row, value):
+        '''
+        Method returns true if a given value does not already occur
+        in a specified row.
+        '''
+        return not self.rows[row] >> value & 1
+
+    def vertical_check(self, col, value):
+        '''
+        Method returns true if a given value does not already occur
+        in a specified column.
+        '''
+        return not self.cols[col] >> value & 1
+
+    def sub_square_check(self, x, y, value):
+        '''
+        Method returns true if a given value at a given location does
+        not already occur in it's parent subsquare.
+        '''
+        return not self.boxes[self.box_index[y][x]] >> value & 1
+
+    def candidate_mask(self, x, y):
+        '''
+        Method returns a mask with a bit set for every value that
+        could be placed at a given location.
+        '''
+        return self.all_digits & ~(
+            self.rows[y] | self.cols[x] | self.boxes[self.box_index[y][x]]
+        )
+
+    def candidates(self, x, y):
+        '''
+        Method returns the set of values that could be placed at a
+        given location without repeating a value in its row, column
+        or subsquare.
+        '''
+        return set(self.digits(self.candidate_mask(x, y)))
+
+    def apply_strategy(self, strategy):
+        '''
+        Method applies a given strategy to an entire board, mutating
+        any cells for which a strategy works. Returns True only if at
+        least one cell was sucessfully mutated for the given strategy.
+        '''
+        passed = False
+
+        for x in range(self.size):
+            for y in range(self.size):
+                if self.board[y][x] == 0:
+                    try:
+                        self.assign(x, y, strategy(self, x, y))
+                        passed = True
+                    except Exception:
+                        pass
+
+        return passed
+
+    def apply_strategies(self, strategies, changed=None):
+        '''
+        Method applies a list of strategies using a work queue of
+        cells, in the same way as SudokuPuzzle.apply_strategies.
+        Returns True only if at least one cell was mutated.
+        '''
+        passed = False
+        board = self.board
+        peers = self.peers
+
+        if changed is None:
+            queue = deque(
+                (x, y) for x in range(self.size) for y in range(self.size)
+                if board[y][x] == 0
+            )
+        else:
+            queue = deque(peer for x, y in changed for peer in peers[y][x])
+
+        while queue:
+            x, y = queue.popleft()
+
+            if board[y][x] != 0:
+                continue
+
+            for strategy in strategies:
+                try:
+                    self.assign(x, y, strategy(self, x, y))
+                except Exception:
+                    continue
+
+                passed = True
+                queue.extend(peers[y][x])
+                break
+
+        return passed
+
+    def search(self, strategies, incremental=False, changed=None):
+        '''
+        Searches for a solution in the same way as SudokuPuzzle.search:
+        strategies are applied until none of them make progress, then
+        the first empty cell (in row-major order) is tried with each of
+        its candidates in turn, undoing the trail after each failure.
+        The incremental and changed arguments work as they do there.
+
+        Returns True if the board was solved, or False (with the board
+        restored to how it was when called) if there is no solution.
+        '''
+        mark = len(self.trail)
+
+        while not self.all_filled():
+
+            stale = True
+
+            if incremental:
+                if self.apply_strategies(strategies, changed):
+                    stale = False
+                changed = ()
+            else:
+                for strategy in strategies:
+                    if self.apply_strategy(strategy):
+                        stale = False
+
+            if stale:
+
+                x, y = next(
+                    (x, y) for y in range(self.size) for x in range(self.size)
+                    if self.board[y][x] == 0
+                )
+
+                for each in self.digits(self.candidate_mask(x, y)):
+
+                    guess = len(self.trail)
+                    self.assign(x, y, each)
+
+                    if self.stats is not None:
+                        self.stats.branches += 1
+
+                    if self.search(strategies, incremental, [(x, y)]):
+                        return True
+
+                    self.undo(guess)
+
+                self.undo(mark)
+                return False
+
+        return True
+
+    def propagate(self, changed=None):
+        '''
+        Method repeatedly fills naked singles (cells with only one
+        candidate) and hidden singles (values with only one possible
+        cell in a row, column or subsquare) until neither remains.
+
+        Work is driven by a queue of cells and a mask of units to
+        check: filling a cell queues its peers and marks the units
+        whose candidates it can change. If changed is given, only the
+        effects of the cells listed in it are checked, otherwise the
+        whole board is.
+
+        Returns False as soon as a contradiction is found: an empty cell
+        with no candidates, a value with no possible cell in a unit, or
+        a cell that is the only place for two different values.
+        '''
+        board = self.board
+        units = self.units
+        peers = self.peers
+        affected_units = self.affected_units
+        all_digits = self.all_digits
+
+        if changed is None:
+            queue = deque(
+                (x, y) for y in range(self.size) for x in range(self.size)
+                if board[y][x] == 0
+            )
+            dirty = (1 << len(units)) - 1
+        else:
+            queue = deque()
+            dirty = 0
+            for x, y in changed:
+                queue.extend(peers[y][x])
+                dirty |= affected_units[y][x]
+
+        while True:
+
+            while queue:
+                x, y = queue.popleft()
+
+                if board[y][x] == 0:
+                    mask = self.candidate_mask(x, y)
+                    if mask == 0:
+                        return False
+                    if mask & (mask - 1) == 0:
+                        self.assign(x, y, mask.bit_length() - 1)
+                        queue.extend(peers[y][x])
+                        dirty |= affected_units[y][x]
+                        if self.stats is not None:
+                            self.stats.filled("naked_single")
+
+            if not dirty:
+                return True
+
+            pending, dirty = dirty, 0
+
+            while pending:
+                low = pending & -pending
+                pending ^= low
+                unit = units[low.bit_length() - 1]
+
+                used = once = twice = 0
+
+                for x, y in unit:
+                    if board[y][x]:
+                        used |= 1 << board[y][x]
+                    else:
+                        mask = self.candidate_mask(x, y)
+                        twice |= once & mask
+                        once |= mask
+
+                if used | once != all_digits:
+                    return False
+
+                singles = once & ~twice & ~used
+
+                if singles:
+                    for x, y in unit:
+                        if board[y][x] == 0:
+                            bit = self.candidate_mask(x, y) & singles
+                            if bit & (bit - 1):
+                                return False
+                            if bit:
+                                self.assign(x, y, bit.bit_length() - 1)
+                                queue.extend(peers[y][x])
+                                dirty |= affected_units[y][x]
+                                if self.stats is not None:
+                                    self.stats.filled("hidden_single")
+
+    def fewest_candidates(self):
+        '''
+        Method returns the (x, y) location of the empty cell with the
+        fewest candidates, or None if every cell is filled.
+        '''
+        best, fewest = None, self.size + 1
+
+        for y in range(self.size):
+            for x in range(self.size):
+                if self.board[y][x] == 0:
+                    count = self.count(self.candidate_mask(x, y))
+                    if count < fewest:
+                        best, fewest = (x, y), count
+            if fewest <= 2:
+                break
+
+        return best
+
+    def search_mrv(self, strategies=(), incremental=False, changed=None):
+        '''
+        Searches for a solution by propagating singles (see propagate)
+        and any given strategies, then guessing on the empty cell with
+        the fewest candidates. Branches are abandoned as soon as
+        propagation finds a contradiction.
+
+        Only the effects of the cells in changed are propagated, or the
+        whole board if changed is None. If incremental is True,
+        strategies are applied with apply_strategies.
+
+        Returns True if the board was solved, or False (with the board
+        restored to how it was when called) if there is no solution.
+        '''
+        mark = len(self.trail)
+
+        while True:
+            filled = len(self.trail)
+
+            if not self.propagate(changed):
+                self.undo(mark)
+                return False
+
+            if not strategies:
+                break
+
+            if changed is not None:
+                changed = list(changed) + self.trail[filled:]
+
+            filled = len(self.trail)
+            stale = True
+
+            if incremental:
+                if self.apply_strategies(strategies, changed):
+                    stale = False
+            else:
+                for strategy in strategies:
+                    if self.apply_strategy(strategy):
+                        stale = False
+
+            if stale:
+                break
+
+            changed = self.trail[filled:]
+
+        if self.all_filled():
+            return True
+
+        x, y = self.fewest_candidates()
+
+        for each in self.digits(self.candidate_mask(x, y)):
+
+            guess = len(self.trail)
+            self.assign(x, y, each)
+
+            if self.stats is not None:
+                self.stats.branches += 1
+
+            if self.search_mrv(strategies, incremental, [(x, y)]):
+                return True
+
+            self.undo(guess)
+
+        self.undo(mark)
+        return False
+
+    def count_solutions(self, limit=2, changed=None):
+        '''
+        Counts the solutions of the board in the same way search_mrv
+        searches for one, stopping once limit solutions are found. The
+        board is left as it was. Returns 0 if the clues already repeat
+        a value in a row, column or subsquare.
+        '''
+        if not self.consistent:
+            return 0
+
+        mark = len(self.trail)
+        count = 0
+
+        if self.propagate(changed):
+            if self.all_filled():
+                count = 1
+            else:
+                x, y = self.fewest_candidates()
+
+                for each in self.digits(self.candidate_mask(x, y)):
+
+                    guess = len(self.trail)
+                    self.assign(x, y, each)
+
+                    if self.stats is not None:
+                        self.stats.branches += 1
+
+                    count += self.count_solutions(limit - count, [(x, y)])
+                    self.undo(guess)
+
+                    if count >= limit:
+                        break
+
+        self.undo(mark)
+        return count
+
+    def solve(self, strategies, mrv=False, incremental=False):
+        '''
+        Solves the board in place using search, or search_mrv if mrv
+        is True.
+
+        Raises an UnsolvablePuzzle exception if no solution exists.
+        '''
+        solved = self.search_mrv(strategies, incremental) if mrv \
+            else self.search(strategies, incremental)
+
+        if not solved:
+            raise UnsolvablePuzzle
+
+        return True
+
+
 def elimination_strategy(self, x, y):
         '''
         Method applies elimination strategy to a given cell, returning
@@ -191,14 +1368,7 @@ def elimination_strategy(self, x, y):
         be raised. If there are no valid options for the cell a
         NoChoices exception will be raised.  
         '''
-        nums = {1,2,3,4,5,6,7,8,9}
-        
-        for i in range(1, 9+1):
-            
-            if not self.horizontal_check(y, i) or \
-                    not self.vertical_check(x, i) or \
-                    not self.sub_square_check(x, y, i):
-                nums.discard(i)
+        nums = self.candidates(x, y)
         
         if len(nums) == 1:
             return list(nums)[0]
@@ -219,12 +1389,55 @@ def load_puzzle(file_name, puzzle_name):
             return SudokuPuzzle(json.load(fh)[puzzle_name])
 
 
-puzzle = load_puzzle("A10_puzzles.json", "medium")
 
-print("Unsolved Puzzle:")
-print(puzzle)
+CELL_CHARS = "0123456789ABCDEFGHIJKLMNOP" # Value of each cell character
+
+
+def board_to_string(board):
+    '''
+    Returns a board as a string of its cells in row-major order, with
+    "0" for empty cells. A 9x9 board gives an 81 character string.
+    Values above 9 (on boards of 16x16 and up) are written as letters,
+    "A" for 10 up to "P" for 25.
+    '''
+    return "".join(CELL_CHARS[cell] for row in board for cell in row)
+
+
+def board_from_string(text):
+    '''
+    Returns a board (a list of rows) from a string of cells in
+    row-major order, as written by board_to_string: 81 characters for
+    a 9x9 board, 256 for 16x16 or 625 for 25x25. Either "0" or "."
+    marks an empty cell.
+    '''
+    size = math.isqrt(len(text))
+    box_size = math.isqrt(size)
+
+    if size * size != len(text) or box_size * box_size != size or \
+            not 1 < size < len(CELL_CHARS):
+        raise ValueError(
+            "Puzzle strings must be 16, 81, 256 or 625 characters long."
+        ) from ValueError
+
+    cells = [0 if char == "." else CELL_CHARS.index(char.upper())
+        for char in text]
+
+    if max(cells) > size:
+        raise ValueError(
+            f"Puzzle strings of {len(text)} characters hold values up to {size}."
+        ) from ValueError
+
+    return [cells[row * size:row * size + size] for row in range(size)]
+
+
+if __name__ == "__main__":
+
+    puzzle = load_puzzle("A10_puzzles.json", "medium")
+
+    print("Unsolved Puzzle:")
+    print(puzzle)
 
-puzzle.solve([elimination_strategy]) 
+    puzzle.solve([elimination_strategy]) 
 
-print("Solved Puzzle:")
-print(puzzle)
\ No newline at end of file
+    print("Solved Puzzle:")
+    print(puzzle)